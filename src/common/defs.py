@@ -26,6 +26,9 @@
 #=====================================================
 # Radios
 RX_1 = 1
+RX_2 = 2
+RX_3 = 3
+MAX_RX = 3
 
 #=====================================================
 # Channel type
@@ -119,3 +122,16 @@ agc_lookup = (
 #=====================================================
 # Displays
 IDLE_TICKER = 100
+# Display refresh target and lowest frames per second
+DISP_FPS = 10
+DISP_MIN_FPS = 2
+# Fraction of the frame period rendering may take before the rate is reduced
+DISP_BUDGET = 0.5
+# Display frame width in bins, resampled to the display width. 0 for one bin per pixel
+DISP_BINS = 0
+# Display span in Hz
+DISP_SPAN = 48000
+# Waterfall frames held and colour range in dBm
+WF_DEPTH = 256
+WF_DB_MIN = -130.0
+WF_DB_MAX = -60.0
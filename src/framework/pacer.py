@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+#
+# pacer.py
+#
+# Display frame pacing for the PyConsole
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+
+Toolkit neutral frame pacing. The toolkit timer calls frame_start() when it
+fires, renders, then calls frame_end() which returns the delay to the next
+frame.
+
+Deadlines advance by exactly one period from the previous deadline, not
+from the end of the render, so render time and timer jitter do not
+accumulate. A frame started after its deadline is late. When a whole period
+or more has been lost the missed frames are counted as skipped and the
+schedule restarts from now rather than firing a burst to catch up.
+
+Rendering done off the timer thread, on a render worker, is reported with
+report_render(). The slowest report in a frame is smoothed separately and
+the budget check uses whichever of the two loads is higher.
+
+The render time is smoothed and if it takes more than the budget fraction
+of the period the rate is stepped down, to no less than the minimum. It is
+stepped back up towards the target when there is ample headroom. The rate
+changes at most once a second so it does not hunt.
+
+"""
+
+#=====================================================
+# Pacing parameters
+# A frame started this fraction of a period after its deadline is late
+PACER_LATE = 0.2
+# Rate step when adapting
+PACER_STEP = 1.25
+# Frames in the achieved rate window
+PACER_WINDOW = 50
+
+#=====================================================
+# Frame pacer
+#=====================================================
+class FramePacer:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, fps = DISP_FPS, min_fps = DISP_MIN_FPS, budget = DISP_BUDGET):
+        """
+        Constructor
+
+        Arguments:
+            fps     --  target frame rate
+            min_fps --  lowest rate to adapt down to
+            budget  --  fraction of the frame period rendering may take
+
+        """
+
+        self.__min_fps = min_fps
+        self.__budget = budget
+        self.set_rate(fps)
+        self.__deadline = None
+        self.__started = 0.0
+        # Slowest render reported since the last frame_end, None if none
+        self.__reported = None
+        self.reset_stats()
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def set_rate(self, fps):
+        # Set the target rate, adapting starts again from here
+        self.__target = float(fps)
+        self.__fps = float(fps)
+        self.period = 1.0/self.__fps
+        self.__hold = 0.0
+
+    def start(self, now = None):
+        # Start the schedule, returns the delay to the first frame
+        self.__deadline = (monotonic() if now == None else now) + self.period
+        return self.period
+
+    def frame_start(self, now = None):
+        # The timer has fired
+        now = monotonic() if now == None else now
+        if self.__deadline == None:
+            self.__deadline = now
+        late = now - self.__deadline
+        if late >= self.period:
+            # Lost whole frames, restart the schedule from now
+            self.skipped += int(late/self.period)
+            self.late += 1
+            self.__deadline = now
+        elif late > PACER_LATE*self.period:
+            self.late += 1
+        self.__started = now
+        self.__times.append(now)
+        self.frames += 1
+
+    def frame_end(self, now = None):
+        # Rendering is done, returns the delay in seconds to the next frame
+        now = monotonic() if now == None else now
+        render = now - self.__started
+        self.render_time += 0.1*(render - self.render_time)
+        if render > self.render_max:
+            self.render_max = render
+        if self.__reported != None:
+            self.worker_time += 0.1*(self.__reported - self.worker_time)
+            self.__reported = None
+        self.__adapt(now)
+        self.__deadline += self.period
+        return max(0.0, self.__deadline - now)
+
+    def report_render(self, seconds):
+        # Render time of a frame rendered elsewhere, counts against the budget
+        if self.__reported == None or seconds > self.__reported:
+            self.__reported = seconds
+
+    def get_stats(self):
+        # Frame statistics
+        n = len(self.__times)
+        span = self.__times[-1] - self.__times[0] if n > 1 else 0.0
+        return {
+            'target_fps' : self.__target,
+            'fps' : self.__fps,
+            'achieved_fps' : (n - 1)/span if span > 0 else 0.0,
+            'frames' : self.frames,
+            'late' : self.late,
+            'skipped' : self.skipped,
+            'render_ms' : self.render_time*1000.0,
+            'render_max_ms' : self.render_max*1000.0,
+            'worker_ms' : self.worker_time*1000.0,
+        }
+
+    def reset_stats(self):
+        self.frames = 0
+        self.late = 0
+        self.skipped = 0
+        self.render_time = 0.0
+        self.render_max = 0.0
+        self.worker_time = 0.0
+        self.__times = deque(maxlen=PACER_WINDOW)
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __adapt(self, now):
+        # Step the rate down when over budget and back up with headroom
+        if now < self.__hold:
+            return
+        fps = self.__fps
+        load = max(self.render_time, self.worker_time)
+        if load > self.__budget*self.period:
+            fps = max(self.__min_fps, fps/PACER_STEP)
+        elif fps < self.__target and load < 0.5*self.__budget/(fps*PACER_STEP):
+            fps = min(self.__target, fps*PACER_STEP)
+        if fps != self.__fps:
+            self.__fps = fps
+            self.period = 1.0/fps
+            self.__hold = now + 1.0
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+#
+# dispatcher.py
+#
+# Asynchronous command dispatcher for the Rust back end lib
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+
+The dispatcher sits in front of the Interface and executes the control
+calls on a dedicated worker thread so the GUI never waits on the library.
+
+Commands are queued in the order posted. A frequency command that is still
+waiting at the end of the queue is updated in place when a new frequency
+arrives so the latest frequency wins and a fast VFO spin results in only a
+few library calls. Once another command has been queued behind it a new
+frequency is queued after that command, so nothing is ever reordered.
+Mode and filter commands are never merged and execute in order.
+Starting and stopping the library are commands too so the GUI can
+start the radio without blocking, wait_idle(0) polls for completion.
+
+The optional completion callback is called on the worker thread as
+callback(kind, value, latency) where latency is seconds from the command
+first being posted to the library call returning. It must not touch GUI
+objects directly.
+
+"""
+
+#=====================================================
+# Command kinds
+CMD_FREQ = 'FREQ'
+CMD_MODE = 'MODE'
+CMD_FILTER = 'FILTER'
+CMD_RUN = 'RUN'
+CMD_CLOSE = 'CLOSE'
+
+#=====================================================
+# Command dispatcher
+#=====================================================
+class Dispatcher:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, interface, callback = None):
+        """
+        Constructor
+
+        Arguments:
+            interface   --  the library Interface instance
+            callback    --  optional completion callback
+
+        """
+
+        self.__if = interface
+        self.__callback = callback
+
+        # Map command kinds to the interface calls
+        self.__calls = {
+            CMD_FREQ : self.__if.set_freq,
+            CMD_MODE : self.__if.set_mode,
+            CMD_FILTER : self.__if.set_filter,
+            CMD_RUN : lambda value: self.__if.run_lib(),
+            CMD_CLOSE : lambda value: self.__if.close_lib(),
+        }
+        # Per kind [posted, executed, coalesced, total latency, max latency]
+        self.__stats = {}
+        for kind in self.__calls:
+            self.__stats[kind] = [0, 0, 0, 0.0, 0.0]
+
+        # Queue of [kind, value, posted time]
+        self.__queue = deque()
+        # The last queued frequency command if it has not yet been taken
+        self.__pending_freq = None
+        # Set while the worker is executing a command
+        self.__busy = False
+        self.__terminate = False
+        self.__cond = threading.Condition()
+
+        # Start the worker
+        self.__thread = threading.Thread(target=self.__run, name='dispatcher', daemon=True)
+        self.__thread.start()
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def set_freq(self, freq):
+        # Set frequency in Hz
+        self.__post(CMD_FREQ, freq)
+
+    def set_mode(self, mode):
+        # Set mode from mode set
+        self.__post(CMD_MODE, mode)
+
+    def set_filter(self, filt):
+        # Set filter from filter set
+        self.__post(CMD_FILTER, filt)
+
+    def run_lib(self):
+        # Start the library
+        self.__post(CMD_RUN, None)
+
+    def close_lib(self):
+        # Stop the library
+        self.__post(CMD_CLOSE, None)
+
+    def wait_idle(self, timeout = None):
+        """
+        Wait until all posted commands have executed
+
+        Arguments:
+            timeout --  max seconds to wait or None to wait forever
+
+        Returns True if idle
+
+        """
+
+        with self.__cond:
+            return self.__cond.wait_for(lambda: len(self.__queue) == 0 and not self.__busy, timeout)
+
+    def get_stats(self):
+        """
+        Return the command statistics
+
+        Returns a dict keyed on command kind with values as a dict of
+        posted, executed, coalesced, mean latency and max latency in seconds.
+
+        """
+
+        stats = {}
+        with self.__cond:
+            for kind, (posted, executed, coalesced, total, maximum) in self.__stats.items():
+                stats[kind] = {
+                    'posted' : posted,
+                    'executed' : executed,
+                    'coalesced' : coalesced,
+                    'mean_latency' : total/executed if executed > 0 else 0.0,
+                    'max_latency' : maximum,
+                }
+        return stats
+
+    def terminate(self):
+        # Stop the worker after any queued commands have executed
+        with self.__cond:
+            self.__terminate = True
+            self.__cond.notify_all()
+        self.__thread.join()
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __post(self, kind, value):
+        with self.__cond:
+            self.__stats[kind][0] += 1
+            if kind == CMD_FREQ and self.__pending_freq != None and self.__queue[-1] is self.__pending_freq:
+                # Latest frequency wins, keep the original post time
+                self.__pending_freq[1] = value
+                self.__stats[kind][2] += 1
+                return
+            cmd = [kind, value, monotonic()]
+            if kind == CMD_FREQ:
+                self.__pending_freq = cmd
+            self.__queue.append(cmd)
+            self.__cond.notify_all()
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                self.__busy = False
+                self.__cond.notify_all()
+                self.__cond.wait_for(lambda: len(self.__queue) > 0 or self.__terminate)
+                if len(self.__queue) == 0:
+                    # Terminating and nothing left to do
+                    return
+                kind, value, posted = cmd = self.__queue.popleft()
+                if cmd is self.__pending_freq:
+                    self.__pending_freq = None
+                self.__busy = True
+
+            # Execute outside the lock so posting never waits on the library
+            try:
+                self.__calls[kind](value)
+            except Exception as e:
+                print('Exception in dispatcher', 'Exception [%s][%s]' % (str(e), traceback.format_exc()))
+            latency = monotonic() - posted
+
+            with self.__cond:
+                stats = self.__stats[kind]
+                stats[1] += 1
+                stats[3] += latency
+                if latency > stats[4]:
+                    stats[4] = latency
+            if self.__callback != None:
+                self.__callback(kind, value, latency)
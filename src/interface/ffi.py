@@ -26,6 +26,52 @@
 # Import all
 from main.imports import *
 
+# cffi is optional, it gives a faster call path than ctypes
+try:
+    import cffi
+except ImportError:
+    cffi = None
+
+#=====================================================
+# Library definitions
+LIB_NAME = "rustsdrlib.dll"
+# The library writes the display data highest frequency first. Frames are
+# handed out in drawing order, lowest frequency first, so the bin order is
+# settled here and nowhere else.
+LIB_DISP_REVERSED = True
+
+# Prototypes for the library entry points as (name, restype, argtypes)
+# These must match the extern "C" declarations in the Rust library.
+# The frequency in Hz is 64 bit so nothing is truncated whatever the callee
+# declares, on x64 an unsigned 32 bit callee simply ignores the upper half.
+LIB_PROTOTYPES = (
+    ('sdrlib_init', None, []),
+    ('sdrlib_run', None, []),
+    ('sdrlib_close', None, []),
+    ('sdrlib_freq', None, [c_uint64]),
+    ('sdrlib_mode', None, [c_uint32]),
+    ('sdrlib_filter', None, [c_uint32]),
+    ('sdrlib_disp_data', POINTER(c_float), []),
+    ('sdrlib_update_disp_width', None, [c_uint32]),
+    ('sdrlib_disp_data_multi', None, [c_uint32, POINTER(c_float), c_uint32]),
+    ('sdrlib_update_disp_width_rx', None, [c_uint32, c_uint32]),
+    ('sdrlib_disp_seq', c_uint64, []),
+)
+
+# The same prototypes for cffi
+LIB_CDEF = """
+    void sdrlib_init(void);
+    void sdrlib_run(void);
+    void sdrlib_close(void);
+    void sdrlib_freq(uint64_t freq);
+    void sdrlib_mode(uint32_t mode);
+    void sdrlib_filter(uint32_t filt);
+    float *sdrlib_disp_data(void);
+    void sdrlib_update_disp_width(uint32_t width);
+    void sdrlib_disp_data_multi(uint32_t num_rx, float *data, uint32_t stride);
+    void sdrlib_update_disp_width_rx(uint32_t rx, uint32_t width);
+    uint64_t sdrlib_disp_seq(void);
+"""
 
 #=====================================================
 # Library interface
@@ -34,10 +80,36 @@ class Interface:
     
     #-------------------------------------------------
     # Constructor
-    def __init__(self):
+    def __init__(self, lib = None, use_cffi = False, lib_path = LIB_NAME):
+        """
+        Constructor
+        
+        Arguments:
+            lib         --  a stand-in library object with the sdrlib_* entry points
+                            or None to load the native library
+            use_cffi    --  bind the native library with cffi rather than ctypes
+            lib_path    --  name or path of the native library
+        
+        """
         
         # Load the library
-        self.lib = cdll.LoadLibrary("rustsdrlib.dll")
+        self.ffi = None
+        if lib != None:
+            self.lib = lib
+        elif use_cffi:
+            if cffi == None:
+                raise ImportError('cffi is not installed')
+            self.ffi = cffi.FFI()
+            self.ffi.cdef(LIB_CDEF)
+            self.lib = self.ffi.dlopen(lib_path)
+        else:
+            self.lib = cdll.LoadLibrary(lib_path)
+            # Declare the prototypes so calls avoid the generic conversions
+            for name, restype, argtypes in LIB_PROTOTYPES:
+                if hasattr(self.lib, name):
+                    f = getattr(self.lib, name)
+                    f.restype = restype
+                    f.argtypes = argtypes
         # Get a handle to all methods
         self.f_init = self.lib.sdrlib_init
         self.f_start = self.lib.sdrlib_run
@@ -47,9 +119,49 @@ class Interface:
         self.f_filt = self.lib.sdrlib_filter
         self.f_disp = self.lib.sdrlib_disp_data
         self.f_width = self.lib.sdrlib_update_disp_width
-        # Pointer to display data
-        self.f_disp.restype = POINTER(c_float)
-        self.disp_ptr = POINTER(c_float)
+        # Multi receiver display entry points are optional
+        if hasattr(self.lib, 'sdrlib_disp_data_multi'):
+            self.f_disp_multi = self.lib.sdrlib_disp_data_multi
+            self.f_width_rx = self.lib.sdrlib_update_disp_width_rx
+        else:
+            self.f_disp_multi = None
+            self.f_width_rx = None
+        # Frame sequence number, optional, stand-in libraries have it
+        self.f_disp_seq = getattr(self.lib, 'sdrlib_disp_seq', None)
+        # Current display width, one float per pixel
+        self.disp_width = 0
+        # Frame tracking
+        # Sequence number and monotonic time of the latest new frame
+        self.disp_seq = 0
+        self.disp_time = 0.0
+        # Last library sequence number seen
+        self.__lib_seq = None
+        # Copy of the last frame seen, used to detect new frames without one
+        self.__last_frame = None
+        # Current tuning, recorded with each frame in the history
+        self.freq = 0
+        self.mode = 0
+        # Optional spectrum history
+        self.history = None
+        # Optional recorder
+        self.recorder = None
+        # Views onto library buffers keyed on (address, width)
+        # The library reuses its buffers so a view only needs making once
+        self.__views = {}
+        # Display width for each receiver
+        self.rx_widths = [0]*MAX_RX
+        # Contiguous (receivers x width) buffer filled by the multi receiver fetch
+        self.__multi_buf = np.zeros((MAX_RX, 0), dtype=np.float32)
+        # The last batch fetched and the frame sequence it was fetched at
+        self.__multi_frames = None
+        self.__multi_seq = -1
+        
+        # Call statistics, the raw functions are kept so stats can be turned off
+        self.__raw_calls = {}
+        for attr, name in self.__entry_points():
+            self.__raw_calls[attr] = (name, getattr(self, attr))
+        self.__stats = {}
+        self.stats_enabled = False
 
     #=====================================================
     # PUBLIC
@@ -65,24 +177,343 @@ class Interface:
     def close_lib(self):
         # Tidy close lib
         self.f_stop()
+    
+    def restart(self):
+        # A hosted library restarts its process, otherwise close and init
+        if hasattr(self.lib, 'restart'):
+            return self.lib.restart()
+        self.close_lib()
+        self.init_lib()
+        return True
         
+    #=====================================================
+    # History
+    def enable_history(self, depth, width, storage = HIST_UINT8):
+        """
+        Keep the last depth frames with their time and tuning
+        
+        Arguments:
+            depth   --  number of frames to keep
+            width   --  max frame width
+            storage --  HIST_FLOAT32 | HIST_INT16 | HIST_UINT8
+            
+        """
+        
+        self.history = SpectrumHistory(depth, width, MAX_RX, storage)
+    
+    #=====================================================
+    # Recording
+    def start_recording(self, path, freq = None, mode = None, filt = None):
+        """
+        Record new frames and control calls to path
+        
+        The recording starts with the current settings. Before anything
+        has been tuned the library settings are not known, the caller
+        gives the settings from the model which the UI will tune to.
+        
+        Arguments:
+            path    --  data file path, see Recorder
+            freq    --  frequency in Hz, None for the last set
+            mode    --  mode, None for the last set
+            filt    --  filter, None for none recorded
+            
+        """
+        
+        self.stop_recording()
+        self.recorder = Recorder(path)
+        # Start with the current settings
+        self.recorder.event(REC_WIDTH, self.disp_width)
+        self.recorder.event(REC_FREQ, self.freq if freq == None else freq)
+        self.recorder.event(REC_MODE, self.mode if mode == None else mode)
+        if filt != None:
+            self.recorder.event(REC_FILTER, filt)
+    
+    def stop_recording(self):
+        if self.recorder != None:
+            self.recorder.close()
+            self.recorder = None
+    
+    #=====================================================
+    # Instrumentation
+    def enable_stats(self, enable = True):
+        """
+        Turn call statistics on or off
+        
+        When off the library functions are called directly at no cost.
+        
+        Arguments:
+            enable  --  True to record stats
+            
+        """
+        
+        self.stats_enabled = enable
+        for attr, (name, func) in self.__raw_calls.items():
+            if enable:
+                if name not in self.__stats:
+                    self.__stats[name] = CallStats()
+                setattr(self, attr, timed(func, self.__stats[name]))
+            else:
+                setattr(self, attr, func)
+    
+    def get_stats(self):
+        # Return {entry point : summary} for each entry point called
+        return {name : stats.summary() for name, stats in self.__stats.items() if stats.count > 0}
+    
+    def reset_stats(self):
+        for stats in self.__stats.values():
+            stats.reset()
+    
+    def dump_stats(self, path):
+        # Write the stats to path as JSON
+        with open(path, 'w') as f:
+            json.dump(self.get_stats(), f, indent=4)
+    
     #=====================================================
     # Call level interface
     def set_freq(self, freq):
         # Set frequency in Hz
+        self.freq = freq
         self.f_freq(freq)
+        if self.recorder != None:
+            self.recorder.event(REC_FREQ, freq)
     
     def set_mode(self, mode):
         # Set mode from mode set
+        self.mode = mode
         self.f_mode(mode)
+        if self.recorder != None:
+            self.recorder.event(REC_MODE, mode)
         
     def set_filter(self, filt):
         # Set filter from filter set
         self.f_filt(filt)
+        if self.recorder != None:
+            self.recorder.event(REC_FILTER, filt)
      
     def get_disp_data(self):
         # Return a pointer to display data
         return self.f_disp()
     
-    def set_disp_width(self, width):
-        self.f_width(width)
\ No newline at end of file
+    def set_disp_width(self, width, rx = RX_1):
+        """
+        Set the display width in pixels for a receiver
+        
+        Arguments:
+            width   --  display width
+            rx      --  RX_1 to RX_3
+            
+        """
+        
+        self.rx_widths[rx-1] = width
+        if rx == RX_1:
+            self.disp_width = width
+            self.f_width(width)
+            if self.recorder != None:
+                self.recorder.event(REC_WIDTH, width)
+        elif self.f_width_rx != None:
+            self.f_width_rx(rx, width)
+    
+    #=====================================================
+    # Frame level interface
+    def get_disp_frame(self):
+        """
+        Return the current display data as a read only array
+        
+        The array is a view directly onto the library buffer in drawing
+        order, lowest frequency first, no copy is made. It is only valid
+        until the next fetch as the library overwrites the buffer in
+        place. Use get_disp_snapshot() to keep a frame.
+        
+        """
+        
+        frame = self.get_lib_frame()
+        if frame is None or not LIB_DISP_REVERSED:
+            return frame
+        return frame[::-1]
+    
+    def get_lib_frame(self):
+        # The display data view in the order the library writes it
+        if self.disp_width <= 0:
+            return None
+        return self.__as_array(self.f_disp(), self.disp_width)
+    
+    def get_disp_snapshot(self):
+        # Return a private copy of the current display data
+        frame = self.get_disp_frame()
+        if frame is None:
+            return None
+        return frame.copy()
+    
+    def poll_disp_frame(self):
+        """
+        Fetch the display data and check if the library has produced a new frame
+        
+        A library with sdrlib_disp_seq numbers its frames. The sequence
+        number moves on by as many frames as the library has produced so a
+        gap is frames that were never fetched. Without it we compare against
+        the last frame seen and a change moves the sequence on by one, so
+        frames missed between polls cannot be counted.
+        
+        Returns the current frame sequence number
+        
+        """
+        
+        frame = self.get_disp_frame()
+        if frame is None:
+            return self.disp_seq
+        if self.f_disp_seq != None:
+            lib_seq = int(self.f_disp_seq())
+            if lib_seq == self.__lib_seq:
+                # Nothing new
+                return self.disp_seq
+            if self.__lib_seq is None or lib_seq < self.__lib_seq:
+                # First frame or the library has restarted
+                step = 1
+            else:
+                step = lib_seq - self.__lib_seq
+            self.__lib_seq = lib_seq
+        else:
+            last = self.__last_frame
+            if last is None or last.shape != frame.shape:
+                self.__last_frame = frame.copy()
+            elif np.array_equal(frame, last):
+                # Nothing new
+                return self.disp_seq
+            else:
+                np.copyto(last, frame)
+            step = 1
+        self.disp_seq += step
+        self.disp_time = monotonic()
+        if self.history != None:
+            self.history.append(frame, self.freq, DISP_SPAN, self.mode, self.disp_time)
+        if self.recorder != None:
+            # Recorded as the library wrote it so a replay is the same
+            self.recorder.frame(frame[::-1] if LIB_DISP_REVERSED else frame)
+        return self.disp_seq
+    
+    def has_new_frame(self, since):
+        """
+        Return True if a frame newer than sequence number since is available
+        
+        Arguments:
+            since   --  the last sequence number the caller processed
+            
+        """
+        
+        return self.poll_disp_frame() > since
+    
+    def get_disp_frames(self, num_rx):
+        """
+        Fetch the display data for all active receivers in one call
+        
+        The data for every receiver is written into one contiguous
+        (receivers x width) buffer where width is the widest receiver.
+        Each row is valid up to that receivers width in rx_widths and
+        is in drawing order, lowest frequency first.
+        The buffer is reused so the array is only valid until the
+        next fetch.
+        
+        Arguments:
+            num_rx  --  number of active receivers
+            
+        Returns a read only (num_rx x width) array or None
+        
+        """
+        
+        if num_rx <= 0:
+            return None
+        width = max(self.rx_widths[:num_rx])
+        if width <= 0:
+            return None
+        if self.__multi_buf.shape[1] < width:
+            # Grow only, the buffer is never shrunk
+            self.__multi_buf = np.zeros((MAX_RX, width), dtype=np.float32)
+        buf = self.__multi_buf
+        if self.f_disp_multi != None:
+            # One call fills every receiver
+            self.f_disp_multi(num_rx, self.__float_ptr(buf), buf.shape[1])
+            if LIB_DISP_REVERSED:
+                for rx in range(num_rx):
+                    row = buf[rx, :self.rx_widths[rx]]
+                    row[:] = row[::-1]
+        else:
+            # Library only has the single receiver call
+            frame = self.get_disp_frame()
+            if frame is not None:
+                buf[0, :frame.shape[0]] = frame
+        frames = buf[:num_rx, :width]
+        frames.flags.writeable = False
+        return frames
+    
+    def get_rx_snapshot(self, rx, num_rx):
+        """
+        Return a private copy of the display data for one receiver
+        
+        The receivers are fetched together with get_disp_frames() once per
+        frame sequence number, the displays for the other receivers then
+        take their rows from the same batch. Without the multi receiver
+        entry point every receiver gets the single display buffer.
+        
+        Arguments:
+            rx      --  RX_1 to RX_3
+            num_rx  --  number of active receivers
+            
+        """
+        
+        if self.f_disp_multi == None or (rx == RX_1 and num_rx <= 1):
+            return self.get_disp_snapshot()
+        if self.__multi_seq != self.disp_seq or self.__multi_frames is None or self.__multi_frames.shape[0] < num_rx:
+            self.__multi_frames = self.get_disp_frames(num_rx)
+            self.__multi_seq = self.disp_seq
+        frames = self.__multi_frames
+        width = self.rx_widths[rx-1]
+        if frames is None or rx > frames.shape[0] or width <= 0:
+            return None
+        return frames[rx-1, :width].copy()
+    
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __as_array(self, ptr, width):
+        # Array view onto a float pointer returned by the library
+        if self.ffi != None:
+            addr = int(self.ffi.cast('uintptr_t', ptr))
+        else:
+            addr = addressof(ptr.contents)
+        view = self.__views.get((addr, width))
+        if view is None:
+            if len(self.__views) >= 16:
+                # Buffers have moved, forget the old ones
+                self.__views.clear()
+            if self.ffi != None:
+                view = np.frombuffer(self.ffi.buffer(ptr, width*4), dtype=np.float32)
+            else:
+                view = np.ctypeslib.as_array(ptr, shape=(width,))
+            view.flags.writeable = False
+            self.__views[(addr, width)] = view
+        return view
+    
+    def __float_ptr(self, array):
+        # Float pointer to pass an array to the library
+        if self.ffi != None:
+            return self.ffi.cast('float *', array.ctypes.data)
+        return array.ctypes.data_as(POINTER(c_float))
+    
+    def __entry_points(self):
+        # (attribute, entry point name) for each library function in use
+        calls = [
+            ('f_init', 'sdrlib_init'),
+            ('f_start', 'sdrlib_run'),
+            ('f_stop', 'sdrlib_close'),
+            ('f_freq', 'sdrlib_freq'),
+            ('f_mode', 'sdrlib_mode'),
+            ('f_filt', 'sdrlib_filter'),
+            ('f_disp', 'sdrlib_disp_data'),
+            ('f_width', 'sdrlib_update_disp_width'),
+        ]
+        if self.f_disp_multi != None:
+            calls.append(('f_disp_multi', 'sdrlib_disp_data_multi'))
+            calls.append(('f_width_rx', 'sdrlib_update_disp_width_rx'))
+        if self.f_disp_seq != None:
+            calls.append(('f_disp_seq', 'sdrlib_disp_seq'))
+        return calls
\ No newline at end of file
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+# ffi_bench.py
+#
+# Microbenchmark of the ctypes and cffi bindings to the Rust back end lib
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+from time import perf_counter
+
+"""
+
+Measures the per call overhead of the control calls and the display fetch
+through each binding. The library is initialised but not run so no radio is
+needed and the calls cost little more than the binding itself.
+
+Usage: python -m interface.ffi_bench [library path] [display width]
+
+"""
+
+#=====================================================
+# Benchmark parameters
+BENCH_CALLS = 200000
+
+#-------------------------------------------------
+# Time a call in ns per call
+def time_call(func, *args):
+    n = BENCH_CALLS
+    t = perf_counter()
+    for i in range(n):
+        func(*args)
+    return (perf_counter() - t)*1e9/n
+
+#-------------------------------------------------
+# Run the benchmark for each binding
+def benchmark(lib_path = LIB_NAME, width = 1000):
+    """
+    Return {binding : {call : ns per call}}
+
+    Arguments:
+        lib_path    --  name or path of the native library
+        width       --  display width to fetch
+
+    """
+
+    bindings = [('ctypes', False)]
+    if cffi != None:
+        bindings.append(('cffi', True))
+    results = {}
+    for name, use_cffi in bindings:
+        lib_if = Interface(use_cffi=use_cffi, lib_path=lib_path)
+        lib_if.init_lib()
+        lib_if.set_disp_width(width)
+        results[name] = {
+            'set_freq' : time_call(lib_if.set_freq, 7100000),
+            'set_mode' : time_call(lib_if.set_mode, CH_USB),
+            'set_filter' : time_call(lib_if.set_filter, CH_2K4),
+            'get_disp_data' : time_call(lib_if.get_disp_data),
+            'get_disp_frame' : time_call(lib_if.get_disp_frame),
+        }
+        lib_if.close_lib()
+    return results
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else LIB_NAME
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    pp.pprint(benchmark(path, width))
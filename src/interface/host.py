@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+#
+# host.py
+#
+# Out of process host for the Rust back end lib
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+"""
+
+Runs the library in a separate host process so its threads do not share
+the GUI process and a stall or crash in the library does not take the
+console down with it.
+
+HostLib is a stand-in library object with the sdrlib_* entry points, so it
+plugs into Interface like SimLib. Control calls are sent to the host over a
+pipe and never wait for a reply. Display frames come back through a ring of
+slots in shared memory. The host writes the next slot and then publishes its
+sequence number in the header, the client hands out a pointer to the latest
+published slot so no copy is made on the GUI side. A slot is not rewritten
+until the ring wraps.
+
+If the host dies it is restarted on the next control call, or within a
+second from the display fetch if nothing is being tuned, and the radio state
+is replayed. The restart runs on its own thread so a slow spawn never stalls
+the caller, and however many callers notice the loss it is restarted once.
+Run this module directly for throughput and latency numbers against the
+in-process path.
+
+"""
+
+#=====================================================
+# Ring parameters
+HOST_RING_SLOTS = 4
+HOST_MAX_WIDTH = 8192
+# Header is [published sequence, slots, max width, library frame sequence] as int64
+HOST_HDR_SIZE = 4
+# Each slot has [sequence, width] as int64
+HOST_META_SIZE = 2
+# Host display poll rate
+HOST_FPS = 20
+# Seconds between host liveness checks from the display fetch
+HOST_CHECK_PERIOD = 1.0
+
+# Backends the host can run
+HOST_NATIVE = 'native'
+HOST_SIM = 'sim'
+
+#-------------------------------------------------
+# Map a ring onto a shared memory buffer
+def ring_arrays(buf, slots, max_width):
+    """
+    Return (header, meta, data) arrays over the buffer
+
+    Arguments:
+        buf         --  shared memory buffer
+        slots       --  number of ring slots
+        max_width   --  max display width
+
+    """
+
+    hdr = np.ndarray((HOST_HDR_SIZE,), dtype=np.int64, buffer=buf, offset=0)
+    offset = hdr.nbytes
+    meta = np.ndarray((slots, HOST_META_SIZE), dtype=np.int64, buffer=buf, offset=offset)
+    offset += meta.nbytes
+    data = np.ndarray((slots, max_width), dtype=np.float32, buffer=buf, offset=offset)
+    return hdr, meta, data
+
+def ring_size(slots, max_width):
+    # Total bytes for a ring
+    return 8*(HOST_HDR_SIZE + slots*HOST_META_SIZE) + 4*slots*max_width
+
+#=====================================================
+# Host process
+#=====================================================
+def host_main(conn, shm_name, backend, fps):
+    """
+    Entry point for the host process
+
+    Arguments:
+        conn        --  pipe end for control commands
+        shm_name    --  name of the shared memory ring
+        backend     --  HOST_NATIVE | HOST_SIM
+        fps         --  rate to poll display data into the ring
+
+    """
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # The client has filled in the ring dimensions
+    hdr = np.ndarray((HOST_HDR_SIZE,), dtype=np.int64, buffer=shm.buf)
+    slots = int(hdr[1])
+    hdr, meta, data = ring_arrays(shm.buf, slots, int(hdr[2]))
+
+    if backend == HOST_SIM:
+        lib_if = Interface(SimLib(fps=fps))
+    else:
+        lib_if = Interface()
+    # Open from init or run until closed, so the library is closed only once
+    lib_open = [False]
+    def open_call(call):
+        def f(value):
+            call()
+            lib_open[0] = True
+        return f
+    def close(value):
+        if lib_open[0]:
+            lib_open[0] = False
+            lib_if.close_lib()
+    calls = {
+        'init' : open_call(lib_if.init_lib),
+        'run' : open_call(lib_if.run_lib),
+        'close' : close,
+        'freq' : lib_if.set_freq,
+        'mode' : lib_if.set_mode,
+        'filter' : lib_if.set_filter,
+        'width' : lib_if.set_disp_width,
+    }
+
+    period = 1.0/fps
+    next_time = monotonic()
+    # Last library frame published
+    last_seq = 0
+    try:
+        while True:
+            # Service commands until the next frame is due
+            timeout = next_time - monotonic()
+            if conn.poll(max(0.0, timeout)):
+                cmd, value = conn.recv()
+                if cmd == 'exit':
+                    break
+                elif cmd == 'ping':
+                    conn.send(('pong', value))
+                else:
+                    calls[cmd](value)
+                continue
+            next_time += period
+            if next_time < monotonic():
+                # Running late, don't try to catch up
+                next_time = monotonic() + period
+            # Publish a new frame if there is one
+            if lib_if.has_new_frame(last_seq):
+                last_seq = lib_if.disp_seq
+                # Published as the library wrote it, the client Interface reorders
+                frame = lib_if.get_lib_frame()
+                seq = int(hdr[0])
+                width = min(frame.shape[0], data.shape[1])
+                slot = (seq + 1) % slots
+                meta[slot, 0] = -1
+                data[slot, :width] = frame[:width]
+                meta[slot, 1] = width
+                meta[slot, 0] = seq + 1
+                hdr[3] = last_seq
+                hdr[0] = seq + 1
+    except (EOFError, OSError, KeyboardInterrupt):
+        # Client has gone
+        pass
+    finally:
+        close(None)
+        del hdr, meta, data
+        shm.close()
+
+#=====================================================
+# Client side library
+#=====================================================
+class HostLib:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, backend = HOST_NATIVE, fps = HOST_FPS, slots = HOST_RING_SLOTS, max_width = HOST_MAX_WIDTH):
+        """
+        Constructor
+
+        Arguments:
+            backend     --  HOST_NATIVE | HOST_SIM
+            fps         --  host display poll rate
+            slots       --  number of ring slots
+            max_width   --  max display width
+
+        """
+
+        self.__backend = backend
+        self.__fps = fps
+
+        # Create the ring, we own it and unlink on close
+        self.__shm = shared_memory.SharedMemory(create=True, size=ring_size(slots, max_width))
+        self.__hdr, self.__meta, self.__data = ring_arrays(self.__shm.buf, slots, max_width)
+        self.__hdr[:] = (0, slots, max_width, 0)
+        self.__meta[:] = 0
+        self.__slot_ptrs = [self.__data[n].ctypes.data_as(POINTER(c_float)) for n in range(slots)]
+
+        # Radio state replayed on restart
+        self.__state = {}
+        self.__running = False
+        self.restarts = 0
+        self.__next_check = 0.0
+        # Set from noticing the host has gone until it has been restarted
+        self.__restarting = False
+
+        self.__ctx = multiprocessing.get_context('spawn')
+        self.__proc = None
+        self.__conn = None
+        self.__lock = threading.Lock()
+        self.__start_host()
+
+    #=====================================================
+    # Library entry points
+    #=====================================================
+    def sdrlib_init(self):
+        self.__state['init'] = None
+        self.__send('init', None)
+
+    def sdrlib_run(self):
+        self.__running = True
+        self.__send('run', None)
+
+    def sdrlib_close(self):
+        self.__running = False
+        self.__send('close', None)
+
+    def sdrlib_freq(self, freq):
+        self.__state['freq'] = freq
+        self.__send('freq', freq)
+
+    def sdrlib_mode(self, mode):
+        self.__state['mode'] = mode
+        self.__send('mode', mode)
+
+    def sdrlib_filter(self, filt):
+        self.__state['filter'] = filt
+        self.__send('filter', filt)
+
+    def sdrlib_disp_data(self):
+        # Pointer to the latest published slot
+        self.__check_host()
+        return self.__slot_ptrs[int(self.__hdr[0]) % len(self.__slot_ptrs)]
+
+    def sdrlib_disp_seq(self):
+        # Library sequence number of the latest published frame, gaps are frames the host skipped
+        return int(self.__hdr[3])
+
+    def sdrlib_update_disp_width(self, width):
+        self.__state['width'] = width
+        self.__send('width', width)
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def restart(self):
+        """
+        Restart the host process and replay the radio state
+
+        The ring and any views onto it stay valid, the UI is not disturbed.
+
+        """
+
+        with self.__lock:
+            self.__stop_host()
+            self.__start_host()
+            self.restarts += 1
+            for cmd in ('init', 'width', 'freq', 'mode', 'filter'):
+                if cmd in self.__state:
+                    self.__conn.send((cmd, self.__state[cmd]))
+            if self.__running:
+                self.__conn.send(('run', None))
+            self.__restarting = False
+        return True
+
+    def ping(self):
+        # Round trip time in seconds through the host
+        with self.__lock:
+            t = monotonic()
+            self.__conn.send(('ping', t))
+            while True:
+                reply, value = self.__conn.recv()
+                if reply == 'pong' and value == t:
+                    return monotonic() - t
+
+    def terminate(self):
+        # Stop the host and release the ring
+        with self.__lock:
+            self.__stop_host()
+        self.__slot_ptrs = []
+        del self.__hdr, self.__meta, self.__data
+        self.__shm.close()
+        self.__shm.unlink()
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __start_host(self):
+        self.__conn, child_conn = self.__ctx.Pipe()
+        self.__proc = self.__ctx.Process(target=host_main, args=(child_conn, self.__shm.name, self.__backend, self.__fps), name='sdrlib-host', daemon=True)
+        self.__proc.start()
+        child_conn.close()
+
+    def __stop_host(self):
+        try:
+            self.__conn.send(('exit', None))
+        except (EOFError, OSError):
+            pass
+        self.__proc.join(2.0)
+        if self.__proc.is_alive():
+            self.__proc.terminate()
+            self.__proc.join()
+        self.__conn.close()
+
+    def __check_host(self):
+        # A display only user would never notice the host has gone, check now and then
+        now = monotonic()
+        if now < self.__next_check:
+            return
+        self.__next_check = now + HOST_CHECK_PERIOD
+        with self.__lock:
+            if self.__restarting or self.__proc.is_alive():
+                return
+            self.__host_lost()
+
+    def __send(self, cmd, value):
+        with self.__lock:
+            if self.__restarting:
+                # The restart replays the state including this call
+                return
+            try:
+                self.__conn.send((cmd, value))
+            except (EOFError, OSError):
+                self.__host_lost()
+
+    def __host_lost(self):
+        # Called holding the lock, restart once on a thread of its own
+        self.__restarting = True
+        print('Backend host lost [exit code %s], restarting' % self.__proc.exitcode)
+        threading.Thread(target=self.restart, name='sdrlib-host-restart', daemon=True).start()
+
+#=====================================================
+# Benchmark in-process against hosted
+#=====================================================
+def benchmark(calls = 20000, frames = 20000, pings = 500):
+    """
+    Compare the in-process and hosted paths with the simulated library
+
+    Returns a dict of results for each path
+
+    """
+
+    results = {}
+    for name in ('in-process', 'hosted'):
+        if name == 'in-process':
+            lib = SimLib(fps=HOST_FPS)
+        else:
+            lib = HostLib(HOST_SIM)
+        lib_if = Interface(lib)
+        lib_if.init_lib()
+        lib_if.set_disp_width(1000)
+        lib_if.run_lib()
+        sleep(0.5)
+
+        # Control call throughput as seen by the caller
+        t = monotonic()
+        for n in range(calls):
+            lib_if.set_freq(7100000 + n)
+        control = calls/(monotonic() - t)
+
+        # Display frame fetch cost
+        t = monotonic()
+        for n in range(frames):
+            lib_if.get_disp_frame()
+        fetch = (monotonic() - t)/frames
+
+        # Control round trip latency
+        rtt = []
+        if name == 'hosted':
+            for n in range(pings):
+                rtt.append(lib.ping())
+            rtt.sort()
+
+        lib_if.close_lib()
+        if name == 'hosted':
+            lib.terminate()
+        results[name] = {
+            'control_calls_per_sec' : control,
+            'frame_fetch_us' : fetch*1e6,
+            'rtt_p50_us' : rtt[len(rtt)//2]*1e6 if rtt else 0.0,
+            'rtt_p99_us' : rtt[int(len(rtt)*0.99)]*1e6 if rtt else 0.0,
+        }
+    return results
+
+if __name__ == '__main__':
+    pp.pprint(benchmark())
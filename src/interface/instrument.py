@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+#
+# instrument.py
+#
+# Call counters and latency histograms for the Rust back end lib
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+from time import perf_counter_ns
+
+"""
+
+Latency is recorded in nanoseconds into a log scale histogram with four
+buckets per power of two, so percentiles are accurate to within 25% and
+recording is a handful of integer operations. Interface wraps its library
+calls with timed() only while stats are enabled, when disabled the raw
+library functions are called and there is no cost at all.
+
+"""
+
+#=====================================================
+# Histogram parameters
+# Buckets per power of two
+STATS_SUB_BUCKETS = 4
+# Covers up to 2^40 ns, about 18 minutes
+STATS_BUCKETS = 40 * STATS_SUB_BUCKETS
+
+#=====================================================
+# Statistics for one entry point
+#=====================================================
+class CallStats:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self):
+        self.reset()
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def reset(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.hist = [0]*STATS_BUCKETS
+
+    def record(self, ns):
+        # Record one call of ns nanoseconds
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        bits = ns.bit_length()
+        if bits > 2:
+            # Top two bits below the leading bit select the sub bucket
+            index = bits*STATS_SUB_BUCKETS + ((ns >> (bits - 3)) & 3)
+        else:
+            index = ns
+        self.hist[min(index, STATS_BUCKETS - 1)] += 1
+
+    def percentile(self, p):
+        """
+        Return the approximate latency in ns at percentile p
+
+        Arguments:
+            p   --  percentile 0-100
+
+        """
+
+        if self.count == 0:
+            return 0
+        target = self.count*p/100.0
+        seen = 0
+        for index, n in enumerate(self.hist):
+            seen += n
+            if seen >= target:
+                return min(self.__bucket_value(index), self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        # Summary in microseconds
+        return {
+            'count' : self.count,
+            'mean_us' : self.total_ns/self.count/1000.0 if self.count > 0 else 0.0,
+            'p50_us' : self.percentile(50)/1000.0,
+            'p99_us' : self.percentile(99)/1000.0,
+            'max_us' : self.max_ns/1000.0,
+        }
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __bucket_value(self, index):
+        # Mid point of the bucket
+        if index < 3*STATS_SUB_BUCKETS:
+            return index
+        bits, sub = divmod(index, STATS_SUB_BUCKETS)
+        low = (4 + sub) << (bits - 3)
+        return low + (1 << (bits - 3))//2
+
+#-------------------------------------------------
+# Wrap a library function to record its latency
+def timed(func, stats):
+    """
+    Return a wrapper for func recording into stats
+
+    Arguments:
+        func    --  the library function
+        stats   --  the CallStats instance
+
+    """
+
+    def wrapper(*args):
+        t = perf_counter_ns()
+        r = func(*args)
+        stats.record(perf_counter_ns() - t)
+        return r
+    return wrapper
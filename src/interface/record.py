@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+#
+# record.py
+#
+# Spectrum recording and replay for the Rust back end lib
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+
+A recording is two files. The data file holds each display frame as int16
+hundredths of a dB, half the size of the float data, in the order the
+library writes it, highest frequency first. The index file has one fixed
+size record per frame or control event giving the time since the start of
+the recording, the kind of record, the value and for frames the offset and
+width of the frame in the data file.
+
+Both files are append only while recording. ReplayLib memory maps them so a
+capture of any length is served without reading it into memory. It is a
+stand-in library with the sdrlib_* entry points and plugs into Interface like
+SimLib, serving the recorded frames at the original or an accelerated speed.
+
+"""
+
+#=====================================================
+# Record kinds
+REC_FRAME = 0
+REC_FREQ = 1
+REC_MODE = 2
+REC_FILTER = 3
+REC_WIDTH = 4
+
+# File layout
+REC_MAGIC = b'PYCREC01'
+REC_INDEX_EXT = '.idx'
+REC_INDEX_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('kind', '<i4'),
+    ('width', '<i4'),
+    ('value', '<i8'),
+    ('offset', '<i8'),
+])
+# Frame resolution, steps per dB
+REC_SCALE = 100.0
+# Largest display width served on replay
+REC_MAX_WIDTH = 8192
+
+#-------------------------------------------------
+# Command line type for the replay speed
+def replay_speed(text):
+    speed = float(text)
+    if not speed > 0:
+        raise argparse.ArgumentTypeError('must be greater than 0, not %s' % text)
+    return speed
+
+#=====================================================
+# Recorder
+#=====================================================
+class Recorder:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, path):
+        """
+        Constructor
+
+        Arguments:
+            path    --  data file path, the index is path + REC_INDEX_EXT
+
+        """
+
+        self.__data = open(path, 'wb')
+        self.__index = open(path + REC_INDEX_EXT, 'wb')
+        self.__data.write(REC_MAGIC)
+        self.__index.write(REC_MAGIC)
+        self.__offset = len(REC_MAGIC)
+        self.__rec = np.zeros(1, dtype=REC_INDEX_DTYPE)
+        self.__scratch = np.zeros(0, dtype=np.float32)
+        self.__start = monotonic()
+        self.__lock = threading.Lock()
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def frame(self, frame):
+        """
+        Record a display frame
+
+        Arguments:
+            frame   --  spectrum in dBm
+
+        """
+
+        width = frame.shape[0]
+        if self.__scratch.shape[0] < width:
+            self.__scratch = np.zeros(width, dtype=np.float32)
+        q = self.__scratch[:width]
+        np.multiply(frame, REC_SCALE, out=q)
+        np.clip(q, -32768, 32767, out=q)
+        np.rint(q, out=q)
+        with self.__lock:
+            self.__write_index(REC_FRAME, width, 0, self.__offset)
+            self.__data.write(q.astype('<i2').tobytes())
+            self.__offset += 2*width
+
+    def event(self, kind, value):
+        """
+        Record a control event
+
+        Arguments:
+            kind    --  REC_FREQ | REC_MODE | REC_FILTER | REC_WIDTH
+            value   --  the new setting
+
+        """
+
+        with self.__lock:
+            self.__write_index(kind, 0, value, 0)
+
+    def close(self):
+        with self.__lock:
+            self.__data.close()
+            self.__index.close()
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __write_index(self, kind, width, value, offset):
+        self.__rec[0] = (monotonic() - self.__start, kind, width, value, offset)
+        self.__index.write(self.__rec.tobytes())
+
+#=====================================================
+# Replay library
+#=====================================================
+class ReplayLib:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, path, speed = 1.0, loop = True, callback = None):
+        """
+        Constructor
+
+        Arguments:
+            path        --  data file path
+            speed       --  replay speed, 1.0 is original speed, must be > 0
+            loop        --  restart at the end of the recording
+            callback    --  optional callback(kind, value) for recorded control events,
+                            called on the thread fetching the display data
+
+        """
+
+        if not speed > 0:
+            raise ValueError('Replay speed must be greater than 0, not %s' % speed)
+        self.__speed = speed
+        self.__loop = loop
+        self.__callback = callback
+
+        # Map the files, nothing is read until it is used
+        self.__data = self.__map(path, np.dtype('<i2'))
+        self.__index = self.__map(path + REC_INDEX_EXT, REC_INDEX_DTYPE)
+        kinds = self.__index['kind']
+        self.__frames = np.flatnonzero(kinds == REC_FRAME)
+        self.__frame_times = np.ascontiguousarray(self.__index['time'][self.__frames])
+        self.__events = np.flatnonzero(kinds != REC_FRAME)
+        self.__event_times = np.ascontiguousarray(self.__index['time'][self.__events])
+        self.duration = float(self.__index['time'][-1]) if len(self.__index) > 0 else 0.0
+        max_width = int(self.__index['width'].max()) if len(self.__index) > 0 else 0
+
+        # The display buffer handed out to the caller
+        self.__width = 0
+        self.__buffer = np.zeros(max(max_width, REC_MAX_WIDTH), dtype=np.float32)
+        self.__buffer_ptr = self.__buffer.ctypes.data_as(POINTER(c_float))
+        self.__served = -1
+        self.__next_event = 0
+        self.__start = None
+        # Times round the recording and sequence number of the frame served
+        self.__loops = 0
+        self.__seq = 0
+        self.__lock = threading.Lock()
+
+    #=====================================================
+    # Library entry points
+    #=====================================================
+    def sdrlib_init(self):
+        pass
+
+    def sdrlib_run(self):
+        self.__start = monotonic()
+        self.__served = -1
+        self.__next_event = 0
+        self.__loops = 0
+
+    def sdrlib_close(self):
+        self.__start = None
+
+    # Control calls have no effect on a recording
+    def sdrlib_freq(self, freq):
+        pass
+
+    def sdrlib_mode(self, mode):
+        pass
+
+    def sdrlib_filter(self, filt):
+        pass
+
+    def sdrlib_disp_data(self):
+        with self.__lock:
+            if self.__start != None and len(self.__frames) > 0:
+                self.__serve(self.__position())
+        return self.__buffer_ptr
+
+    def sdrlib_disp_seq(self):
+        # Sequence number of the frame served, frames passed over by a slow caller leave a gap
+        with self.__lock:
+            return self.__seq
+
+    def sdrlib_update_disp_width(self, width):
+        with self.__lock:
+            self.__width = min(width, self.__buffer.shape[0])
+            # Serve the current frame again at the new width
+            self.__served = -1
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def control_events(self):
+        # The recorded control events as index records
+        return self.__index[self.__events]
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __map(self, path, dtype):
+        # Memory map a file after the magic, an empty map is not allowed
+        with open(path, 'rb') as f:
+            if f.read(len(REC_MAGIC)) != REC_MAGIC:
+                raise ValueError('%s is not a recording' % path)
+        if os.path.getsize(path) == len(REC_MAGIC):
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', offset=len(REC_MAGIC))
+
+    def __position(self):
+        # Position in the recording in seconds
+        pos = (monotonic() - self.__start)*self.__speed
+        if pos > self.duration and self.__loop and self.duration > 0:
+            # Finish this pass then start again in phase with the clock
+            self.__deliver(self.duration)
+            loops = int(pos//self.duration)
+            self.__start += loops*self.duration/self.__speed
+            self.__loops += loops
+            self.__next_event = 0
+            pos -= loops*self.duration
+        return pos
+
+    def __deliver(self, pos):
+        # Deliver the control events up to and including pos
+        last = np.searchsorted(self.__event_times, pos, side='right')
+        if self.__callback != None:
+            for n in range(self.__next_event, last):
+                rec = self.__index[self.__events[n]]
+                self.__callback(int(rec['kind']), int(rec['value']))
+        self.__next_event = last
+
+    def __serve(self, pos):
+        # Deliver any control events passed
+        self.__deliver(pos)
+        # Latest frame at this position
+        n = max(0, np.searchsorted(self.__frame_times, pos, side='right') - 1)
+        if n == self.__served or self.__width <= 0:
+            return
+        self.__served = n
+        self.__seq = self.__loops*len(self.__frames) + n + 1
+        rec = self.__index[self.__frames[n]]
+        start = (int(rec['offset']) - len(REC_MAGIC))//2
+        frame = self.__data[start:start + int(rec['width'])]
+        out = self.__buffer[:self.__width]
+        if frame.shape[0] == self.__width:
+            np.multiply(frame, 1.0/REC_SCALE, out=out)
+        else:
+            # Recorded at another width, interpolate to the display width
+            x = np.linspace(0, frame.shape[0] - 1, self.__width)
+            out[:] = np.interp(x, np.arange(frame.shape[0]), frame)/REC_SCALE
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+#
+# sim_lib.py
+#
+# Simulated Rust back end lib for testing and benchmarking
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+
+A pure Python stand-in for rustsdrlib with the same entry points. It needs no
+hardware and runs anywhere NumPy does so the front ends can be exercised and
+load tested without the real library.
+
+A generator thread writes a synthetic spectrum into a fixed buffer at the
+configured frame rate, in place, as the real library does. The spectrum is a
+noise floor plus a set of carriers at fixed RF frequencies so they move across
+the display as the radio is tuned.
+
+"""
+
+#=====================================================
+# Simulation parameters
+# Display span in Hz
+SIM_SPAN = 48000
+# Largest display width supported, the buffer is never reallocated
+SIM_MAX_WIDTH = 8192
+# Noise floor and noise deviation in dBm
+SIM_NOISE_FLOOR = -125.0
+SIM_NOISE_DEV = 3.0
+# Default carriers as (freq Hz, level dBm, width Hz)
+SIM_CARRIERS = (
+    (7090000, -60.0, 200),
+    (7097500, -85.0, 2400),
+    (7100000, -45.0, 100),
+    (7104300, -95.0, 50),
+    (7112000, -75.0, 2700),
+)
+
+#=====================================================
+# Simulated library
+#=====================================================
+class SimLib:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, fps = 10, width = 0, carriers = SIM_CARRIERS):
+        """
+        Constructor
+
+        Arguments:
+            fps         --  frames per second to generate
+            width       --  initial display width in pixels
+            carriers    --  sequence of (freq Hz, level dBm, width Hz)
+
+        """
+
+        self.__period = 1.0/fps
+        # Display width for each receiver
+        self.__widths = [0]*MAX_RX
+        self.__widths[0] = min(width, SIM_MAX_WIDTH)
+        self.__carriers = np.array(carriers, dtype=np.float64).reshape(-1, 3)
+
+        # Radio state
+        self.__freq = 7100000
+        self.__mode = CH_LSB
+        self.__filter = CH_2K4
+
+        # The display buffers, one row per receiver, RX_1 is handed out to the caller
+        self.__buffer = np.full((MAX_RX, SIM_MAX_WIDTH), SIM_NOISE_FLOOR, dtype=np.float32)
+        self.__buffer_ptr = self.__buffer[0].ctypes.data_as(POINTER(c_float))
+        self.__rng = np.random.default_rng()
+        # Frames generated
+        self.__seq = 0
+
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.__terminate = threading.Event()
+
+    #=====================================================
+    # Library entry points
+    #=====================================================
+    def sdrlib_init(self):
+        pass
+
+    def sdrlib_run(self):
+        if self.__thread != None:
+            return
+        self.__terminate.clear()
+        self.__thread = threading.Thread(target=self.__run, name='simlib', daemon=True)
+        self.__thread.start()
+
+    def sdrlib_close(self):
+        if self.__thread == None:
+            return
+        self.__terminate.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def sdrlib_freq(self, freq):
+        self.__freq = freq
+
+    def sdrlib_mode(self, mode):
+        self.__mode = mode
+
+    def sdrlib_filter(self, filt):
+        self.__filter = filt
+
+    def sdrlib_disp_data(self):
+        return self.__buffer_ptr
+
+    def sdrlib_disp_seq(self):
+        # Sequence number of the latest frame
+        return self.__seq
+
+    def sdrlib_update_disp_width(self, width):
+        self.sdrlib_update_disp_width_rx(RX_1, width)
+
+    def sdrlib_update_disp_width_rx(self, rx, width):
+        with self.__lock:
+            self.__widths[rx-1] = min(width, SIM_MAX_WIDTH)
+
+    def sdrlib_disp_data_multi(self, num_rx, out_ptr, stride):
+        # Copy all receivers into the callers (num_rx x stride) buffer
+        out = np.ctypeslib.as_array(out_ptr, shape=(num_rx, stride))
+        width = min(stride, SIM_MAX_WIDTH)
+        with self.__lock:
+            out[:, :width] = self.__buffer[:num_rx, :width]
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __run(self):
+        # Generate frames at the frame rate until closed
+        next_time = monotonic()
+        while not self.__terminate.is_set():
+            self.__make_frame()
+            next_time += self.__period
+            delay = next_time - monotonic()
+            if delay > 0:
+                self.__terminate.wait(delay)
+            else:
+                # Running late, don't try to catch up
+                next_time = monotonic()
+
+    def __make_frame(self):
+        with self.__lock:
+            for rx in range(MAX_RX):
+                self.__make_rx_frame(rx, self.__widths[rx])
+            self.__seq += 1
+
+    def __make_rx_frame(self, rx, width):
+        if width <= 0:
+            return
+        # Noise floor
+        frame = self.__rng.normal(SIM_NOISE_FLOOR, SIM_NOISE_DEV, width)
+        # Frequency at the centre of each pixel
+        hz_per_pixel = SIM_SPAN/width
+        st_freq = self.__freq - SIM_SPAN/2
+        pixel_freq = st_freq + (np.arange(width) + 0.5)*hz_per_pixel
+        # Add each carrier in view as a gaussian shape at least one pixel wide
+        for freq, level, bw in self.__carriers:
+            if abs(freq - self.__freq) > SIM_SPAN/2 + 4*bw:
+                continue
+            sigma = max(bw/2.0, hz_per_pixel)
+            # A gaussian in dB is a parabola, 20*log10(e)/2 = 4.343
+            shape = level - 4.343*((pixel_freq - freq)/sigma)**2
+            np.maximum(frame, shape, out=frame)
+        # Write in place as the real library does, highest frequency first
+        self.__buffer[rx, :width] = frame[::-1]
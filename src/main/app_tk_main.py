@@ -33,6 +33,12 @@ from main.imports import *
 #=====================================================
 class AppMain:
     
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, args):
+        # Command line options
+        self.__args = args
+    
     #-------------------------------------------------
     # Start processing and wait for user to exit the application
     def main(self):
@@ -41,20 +47,66 @@ class AppMain:
         self.__m = Model()
         addToCache('model_inst', self.__m)
         self.__m.restore_model()
+        if self.__args.auto_range:
+            Model.get_app_model()['AUTO_RANGE'] = True
         
         # Create lib interface
-        self.lib_if = Interface()
+        self.host_lib = None
+        self.__ui = None
+        if self.__args.host:
+            # Run the library in a separate host process
+            self.host_lib = HostLib(HOST_SIM if self.__args.sim else HOST_NATIVE)
+            self.lib_if = Interface(self.host_lib)
+        elif self.__args.replay != None:
+            # Replay a recording, the recorded settings are shown as they come round
+            self.lib_if = Interface(ReplayLib(self.__args.replay, self.__args.replay_speed, callback=self.__replay_event))
+        elif self.__args.sim:
+            # Simulated library for testing without the radio
+            self.lib_if = Interface(SimLib(fps=self.__args.sim_fps))
+        else:
+            self.lib_if = Interface()
         addToCache("interface_inst", self.lib_if)
+        if self.__args.stats != None:
+            # Record library call statistics
+            self.lib_if.enable_stats()
+        if self.__args.record != None:
+            # Nothing is tuned yet, start from the settings in the model
+            radio = Model.get_radio_model()[RX_1]
+            self.lib_if.start_recording(self.__args.record, int(round(radio['FREQ']*1000000)), radio['MODE'], radio['FILTER'])
+        # Create the command dispatcher for control calls
+        self.dispatcher = Dispatcher(self.lib_if)
+        addToCache("dispatcher_inst", self.dispatcher)
         
         # Init server
         self.lib_if.init_lib()
         
         # Create the UI
-        ui = TkUi()
-        ui.run()
+        self.__ui = TkUi(self.__args.fps)
+        self.__ui.run()
         
         # Close the lib
+        self.dispatcher.terminate()
         self.lib_if.close_lib()
+        self.lib_if.stop_recording()
+        if self.host_lib != None:
+            self.host_lib.terminate()
+        if self.__args.stats != None:
+            self.lib_if.dump_stats(self.__args.stats)
+    
+    #-------------------------------------------------
+    # Recorded control event during a replay
+    def __replay_event(self, kind, value):
+        # Called from the display fetch in the Tk frame loop, a frequency
+        # of 0 is an old recording that started before anything was tuned.
+        # The recorded width needs nothing, frames are resampled to the display.
+        if self.__ui == None:
+            return
+        if kind == REC_FREQ and value > 0:
+            self.__ui.set_freq(value)
+        elif kind == REC_MODE:
+            self.__ui.set_mode(value)
+        elif kind == REC_FILTER:
+            self.__ui.set_filter(value)
         
 #=====================================================
 # Entry point
@@ -64,7 +116,17 @@ class AppMain:
 # Start processing and wait for user to exit the application
 def main():
     try:
-        app = AppMain()
+        parser = argparse.ArgumentParser(description='PyConsole')
+        parser.add_argument('--sim', action='store_true', help='use the simulated library')
+        parser.add_argument('--sim-fps', type=float, default=10, help='simulated frames per second')
+        parser.add_argument('--host', action='store_true', help='run the library in a separate host process')
+        parser.add_argument('--record', metavar='FILE', help='record display frames and control calls to FILE')
+        parser.add_argument('--replay', metavar='FILE', help='replay a recording instead of running the radio')
+        parser.add_argument('--replay-speed', type=replay_speed, default=1.0, help='replay speed, 1.0 is original speed')
+        parser.add_argument('--fps', type=float, default=DISP_FPS, help='display refresh rate')
+        parser.add_argument('--auto-range', action='store_true', help='follow the noise floor with the display dB scale')
+        parser.add_argument('--stats', metavar='FILE', help='record library call statistics and write them to FILE on exit')
+        app = AppMain(parser.parse_args())
         sys.exit(app.main())
         
     except Exception as e:
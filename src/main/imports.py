@@ -28,37 +28,60 @@
 import os,sys
 sys.path.append('..')
 import traceback
+import threading
+from collections import deque
 import socket
 import json
 import pickle
-from subprocess import Popen, CREATE_NEW_CONSOLE 
+import argparse
+if sys.platform == 'win32':
+    from subprocess import Popen, CREATE_NEW_CONSOLE
+else:
+    from subprocess import Popen
 from enum import Enum, auto
-from time import sleep
+from time import sleep, monotonic, perf_counter
 import logging
 import pprint
 pp = pprint.PrettyPrinter(indent=4)
 
+import numpy as np
+
 from ctypes import *
-os.add_dll_directory('E:\\Projects\\RustSDRLib\\trunk\\rust_sdr_lib\\libs')
+# The native library is Windows only, elsewhere run with the simulator
+if sys.platform == 'win32':
+    os.add_dll_directory('E:\\Projects\\RustSDRLib\\trunk\\rust_sdr_lib\\libs')
 #os.add_dll_directory('C:\\Projects\\RustSDRLib\\trunk\\rust_sdr_lib\\libs')
 
 #=====================================================
 # Lib imports
-from PyQt5.QtCore import Qt, QObject, QEvent, QTimer, QMargins, QPointF
-from PyQt5.QtGui import QPalette, QColor, QIcon, QPen, QBrush, QFont, QPainterPath, QPainter
+from PyQt5.QtCore import Qt, QObject, QEvent, QTimer, QMargins, QPointF, QRectF, pyqtSignal
+from PyQt5.QtGui import QPalette, QColor, QIcon, QPen, QBrush, QFont, QPainterPath, QPainter, QPolygonF, QPixmap, QImage, QRegion
 from PyQt5.QtWidgets import QApplication, qApp
-from PyQt5.QtWidgets import QWidget, QStyle, QStatusBar, QMainWindow, QAction
+from PyQt5.QtWidgets import QWidget, QStyle, QStatusBar, QMainWindow, QAction, QMenu
 from PyQt5.QtWidgets import QGridLayout, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QButtonGroup, QComboBox, QCheckBox
 
 #=====================================================
 # Application imports
+#Common
+# Must come first as the modules below pick up the definitions from here
+from common.defs import *
+# Spectrum
+from spectrum.history import *
+from spectrum.resample import *
+from spectrum.geometry import *
+from spectrum.traces import *
+from spectrum.autorange import *
 # Interface
+from interface.instrument import *
+from interface.record import *
 from interface.ffi import *
+from interface.dispatcher import *
+from interface.sim_lib import *
+from interface.host import *
 
-#Common
-from common.defs import *
 # Framework
 from framework.instance_cache import *
+from framework.pacer import *
 from framework.broker import *
 # Model
 from model.model import *
@@ -67,13 +90,18 @@ from model.model import *
 # Connector
 #from connector.connector import *
 # UI
-from ui.tk.tk_ui import *
 from ui.components.vfo import *
 from ui.components.button_base import *
 from ui.components.modes import *
 from ui.components.filters import *
 from ui.components.agc import *
+from ui.display.scheduler import *
+from ui.display.render import *
 from ui.display.display import *
+from ui.display.waterfall import *
+from ui.tk.tk_scheduler import *
+from ui.tk.tk_waterfall import *
+from ui.tk.tk_ui import *
 # Windows
 from ui.windows.window_base import *
 from ui.windows.display_window import *
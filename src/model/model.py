@@ -43,7 +43,9 @@ class Model:
         self.__default_model = {
             'APP' : {
                 # Dict of arrays {id:[x,y,width,height], id:[...]}
-                'METRICS' : {}
+                'METRICS' : {},
+                # Displays follow the noise floor
+                'AUTO_RANGE' : False
             },
             'RADIO' : {
                 'NUM_RX' : 1,
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+#
+# autorange.py
+#
+# Noise floor estimation and display auto ranging for the PyConsole
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+
+Chooses the dB range of a display from the signal.
+
+Every frame is added to a histogram of levels in 1 dB bins which decays by
+a constant factor per frame, an exponentially weighted level distribution
+over the last few seconds. The noise floor and peak are read off as low and
+high percentiles of the histogram with a cumulative sum over a few hundred
+bins, there is no sort of the frame.
+
+The display bottom is placed a margin below the noise floor, raised if
+needed so the peak fits under the top, and rounded to the grid step. It
+only moves when the ideal bottom has moved more than the hysteresis beyond
+the current one, so the grid, which is costly to redraw, stays put while
+the band is steady.
+
+"""
+
+#=====================================================
+# Estimator parameters
+# Histogram range in dBm
+AR_DB_MIN = -200
+AR_DB_MAX = 20
+# Histogram decay per frame
+AR_DECAY = 0.95
+# Percentiles for the noise floor and peak
+AR_FLOOR_PC = 20.0
+AR_PEAK_PC = 99.9
+# Space below the noise floor and above the peak in dB
+AR_MARGIN = 10.0
+# dB the ideal bottom must move beyond the current one before it is changed
+AR_HYSTERESIS = 6.0
+
+#=====================================================
+# Auto range
+#=====================================================
+class AutoRange:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, span, step = 10.0, low = -140.0):
+        """
+        Constructor
+
+        Arguments:
+            span    --  displayed range in dB
+            step    --  grid step in dB, the range moves in whole steps
+            low     --  initial bottom of the range in dBm
+
+        """
+
+        self.span = span
+        self.step = step
+        self.low = low
+        self.floor = None
+        self.peak = None
+        self.changes = 0
+        self.__hist = np.zeros(AR_DB_MAX - AR_DB_MIN, dtype=np.float64)
+        self.__levels = None
+        self.__index = None
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def update(self, frame):
+        """
+        Add a frame and return the bottom of the range in dBm
+
+        Arguments:
+            frame   --  spectrum in dBm
+
+        """
+
+        # Add the frame to the decaying histogram, floor not truncate so
+        # -120.5 goes in the bin for -121 up to -120 like any other level
+        if self.__index is None or self.__index.shape[0] != frame.shape[0]:
+            self.__levels = np.zeros(frame.shape[0], dtype=np.float32)
+            self.__index = np.zeros(frame.shape[0], dtype=np.intp)
+        np.floor(frame, out=self.__levels)
+        np.clip(self.__levels, AR_DB_MIN, AR_DB_MAX - 1, out=self.__levels)
+        np.copyto(self.__index, self.__levels, casting='unsafe')
+        np.subtract(self.__index, AR_DB_MIN, out=self.__index)
+        self.__hist *= AR_DECAY
+        self.__hist += np.bincount(self.__index, minlength=self.__hist.shape[0])
+
+        # Read off the floor and the peak
+        cum = np.cumsum(self.__hist)
+        total = cum[-1]
+        self.floor = AR_DB_MIN + np.searchsorted(cum, total*AR_FLOOR_PC/100.0)
+        self.peak = AR_DB_MIN + np.searchsorted(cum, total*AR_PEAK_PC/100.0) + 1
+
+        # Ideal bottom, the floor takes priority over the peak
+        ideal = max(self.floor - AR_MARGIN, self.peak + AR_MARGIN - self.span)
+        ideal = min(ideal, self.floor - AR_MARGIN/2.0)
+        low = float(np.floor(ideal/self.step)*self.step)
+        if low != self.low and abs(ideal - self.low) > AR_HYSTERESIS:
+            self.low = low
+            self.changes += 1
+        return self.low
+
+    def high(self):
+        # Top of the range in dBm
+        return self.low + self.span
+
+    def reset(self):
+        # Forget the history
+        self.__hist[:] = 0.0
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+#
+# geometry.py
+#
+# Toolkit neutral spectrum display geometry for the PyConsole
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+from time import perf_counter
+
+"""
+
+The maths shared by the Qt and Tk spectrum displays. Given the display
+size, margins, dB range and frequency view it provides the dB and
+frequency to pixel transforms, the grid lines and legend values, and the
+trace as an (n, 2) array of x, y ready to hand to a polyline.
+
+The grid lines and legends are arrays and lists cached until the size,
+range or view they depend on changes, the set_ methods return True when
+something changed so the caller knows to redraw its static items. The
+trace is resampled to the plot width, with a min/max envelope of two
+points per pixel when there are more bins than pixels, and the y values
+are written in place into the caller's array, which for Qt is the memory
+of a QPolygonF.
+
+The frame must be in drawing order, lowest frequency on the left.
+
+Usage: python -m spectrum.geometry [bins] [width]
+
+"""
+
+#=====================================================
+# Spectrum geometry
+#=====================================================
+class SpecGeometry:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, left, right, top, bottom):
+        """
+        Constructor
+
+        Arguments:
+            left    --  left margin in pixels
+            right   --  right margin in pixels
+            top     --  top margin in pixels
+            bottom  --  bottom margin in pixels
+
+        """
+
+        self.left = left
+        self.right = right
+        self.top = top
+        self.bottom = bottom
+        # Size and plot area
+        self.width = 0
+        self.height = 0
+        self.pixels = 0
+        self.v_space = 0
+        self.freq_divs = 1
+        # dB range, bottom of the plot, dB per division and divisions
+        self.db_low = -140.0
+        self.db_step = 10.0
+        self.db_divs = 1
+        self.dbpp = 1.0
+        # Frequency of the first plot pixel and frequency per pixel
+        self.st_freq = 0.0
+        self.fpp = 1.0
+        # Cached grid and legends, None when out of date
+        self.__h_lines = None
+        self.__v_lines = None
+        self.__db_legends = None
+        self.__freq_legends = None
+        self.__resampler = None
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def set_size(self, width, height, freq_divs):
+        """
+        Set the display size, returns True if it has changed
+
+        Arguments:
+            width       --  display width
+            height      --  display height
+            freq_divs   --  number of vertical grid divisions
+
+        """
+
+        if (width, height, freq_divs) == (self.width, self.height, self.freq_divs):
+            return False
+        self.width = width
+        self.height = height
+        self.freq_divs = max(1, freq_divs)
+        self.pixels = max(0, width - self.left - self.right)
+        self.v_space = max(0, height - self.top - self.bottom)
+        self.__scale()
+        self.__h_lines = self.__v_lines = self.__db_legends = self.__freq_legends = None
+        return True
+
+    def set_db_range(self, low, step, divs):
+        """
+        Set the dB range, returns True if it has changed
+
+        Arguments:
+            low     --  dBm at the bottom of the plot
+            step    --  dB per division
+            divs    --  number of horizontal grid divisions
+
+        """
+
+        if (low, step, divs) == (self.db_low, self.db_step, self.db_divs):
+            return False
+        self.db_low = low
+        self.db_step = step
+        self.db_divs = max(1, divs)
+        self.__scale()
+        self.__h_lines = self.__db_legends = None
+        return True
+
+    def db_high(self):
+        # dBm at the top of the plot
+        return self.db_low + self.db_step*self.db_divs
+
+    def set_span(self, center, span, first = 0, last = 1, bins = 1):
+        """
+        Set the frequency view, returns True if it has changed
+
+        Arguments:
+            center  --  centre frequency of the full span
+            span    --  full span in the same units
+            first   --  first bin in view
+            last    --  bin after the last in view
+            bins    --  bins in the full span
+
+        """
+
+        st_freq = (center - span/2.0) + (span*first/bins)
+        fpp = (span*(last - first)/bins)/float(max(1, self.pixels))
+        if (st_freq, fpp) == (self.st_freq, self.fpp):
+            return False
+        self.st_freq = st_freq
+        self.fpp = fpp
+        self.__freq_legends = None
+        return True
+
+    #=====================================================
+    # Transforms
+    def db_to_y(self, dbm, out):
+        """
+        Convert an array of dBm to y coordinates in place
+
+        Levels outside the dB range are held at the top or bottom edge.
+
+        Arguments:
+            dbm     --  array of dBm
+            out     --  float64 array or view for the y values
+
+        """
+
+        # y = (top + v_space) - (dbm - db_low)*dbpp, up from the bottom edge
+        np.subtract(dbm, self.db_low, out=out)
+        np.multiply(out, -self.dbpp, out=out)
+        np.add(out, self.top + self.v_space, out=out)
+        np.clip(out, self.top, self.top + self.v_space, out=out)
+
+    def freq_to_x(self, freq):
+        # Pixel of a frequency, scalar or array
+        return self.left + (freq - self.st_freq)/self.fpp
+
+    def x_to_freq(self, x):
+        # Frequency at a pixel, scalar or array
+        return self.st_freq + (x - self.left)*self.fpp
+
+    #=====================================================
+    # Grid and legends
+    def h_lines(self):
+        # (db_divs + 1, 4) array of x0, y0, x1, y1, bottom line first
+        if self.__h_lines is None:
+            y = self.top + self.v_space - np.arange(self.db_divs + 1)*(self.v_space/self.db_divs)
+            lines = np.empty((self.db_divs + 1, 4), dtype=np.float64)
+            lines[:, 0] = self.left
+            lines[:, 1] = y
+            lines[:, 2] = self.left + self.pixels
+            lines[:, 3] = y
+            self.__h_lines = lines
+        return self.__h_lines
+
+    def v_lines(self):
+        # (freq_divs + 1, 4) array of x0, y0, x1, y1, left line first
+        if self.__v_lines is None:
+            x = self.left + np.arange(self.freq_divs + 1)*(self.pixels/self.freq_divs)
+            lines = np.empty((self.freq_divs + 1, 4), dtype=np.float64)
+            lines[:, 0] = x
+            lines[:, 1] = self.top
+            lines[:, 2] = x
+            lines[:, 3] = self.top + self.v_space
+            self.__v_lines = lines
+        return self.__v_lines
+
+    def db_legends(self):
+        # List of (y, dBm) at each horizontal line, bottom first
+        if self.__db_legends is None:
+            self.__db_legends = [(float(line[1]), self.db_low + n*self.db_step) for n, line in enumerate(self.h_lines())]
+        return self.__db_legends
+
+    def freq_legends(self):
+        # List of (x, frequency) at each vertical line, left first
+        if self.__freq_legends is None:
+            f_step = (self.pixels/self.freq_divs)*self.fpp
+            self.__freq_legends = [(float(line[0]), self.st_freq + n*f_step) for n, line in enumerate(self.v_lines())]
+        return self.__freq_legends
+
+    def freq_places(self, scale = 1.0):
+        """
+        Decimal places to show the frequency legends apart, at least 3
+
+        Arguments:
+            scale   --  factor from frequency units to legend units
+
+        """
+
+        f_step = (self.pixels/self.freq_divs)*self.fpp*scale
+        return max(3, int(np.ceil(-np.log10(f_step)))) if f_step > 0 else 3
+
+    #=====================================================
+    # Trace
+    def trace_points(self, bins):
+        """
+        Return the number of trace points for a frame of bins
+
+        Two points per pixel when the trace is an envelope. A change of
+        point count means the caller must allocate a new trace and fill
+        its x coordinates with trace_x().
+
+        """
+
+        if self.__resampler is None or not self.__resampler.matches(bins, self.pixels):
+            self.__resampler = Resampler(bins, self.pixels)
+        return self.pixels*(2 if self.__resampler.envelope else 1)
+
+    def trace_x(self, xy):
+        # Fill the x coordinates of an (n, 2) trace of one or two points per pixel
+        per_pixel = xy.shape[0]//self.pixels
+        xy[:, 0] = np.repeat(np.arange(self.left, self.left + self.pixels), per_pixel)
+
+    def trace(self, frame, xy, low = False):
+        """
+        Resample a frame and write the y coordinates of a trace
+
+        Arguments:
+            frame   --  spectrum in dBm in drawing order
+            xy      --  (n, 2) float64 trace from trace_points() and trace_x()
+            low     --  use the minimum not the maximum when one point per pixel
+
+        """
+
+        self.trace_points(frame.shape[0])
+        v_min, v_max = self.__resampler.resample(frame)
+        if xy.shape[0] == 2*self.pixels:
+            # A vertical min/max line at each pixel
+            y = xy.reshape(self.pixels, 2, 2)[:, :, 1]
+            self.db_to_y(v_max, y[:, 0])
+            self.db_to_y(v_min, y[:, 1])
+            # Alternate the order so the joins run max to max and min to min
+            y[1::2] = y[1::2, ::-1]
+        else:
+            self.db_to_y(v_min if low else v_max, xy[:, 1])
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __scale(self):
+        self.dbpp = float(self.v_space)/(self.db_step*self.db_divs)
+
+#-------------------------------------------------
+# Benchmark the per frame geometry work
+def benchmark(bins = 4096, width = 1000, frames = 2000):
+    """
+    Return {step : us per frame}
+
+    Arguments:
+        bins    --  frame width in bins
+        width   --  display width
+        frames  --  frames to time
+
+    """
+
+    geom = SpecGeometry(50, 10, 10, 20)
+    geom.set_size(width, 300, width//50)
+    geom.set_db_range(-140.0, 10.0, 10)
+    geom.set_span(7.1, 0.048)
+    xy = np.zeros((geom.trace_points(bins), 2), dtype=np.float64)
+    geom.trace_x(xy)
+    frame = np.random.uniform(-130.0, -60.0, bins).astype(np.float32)
+    results = {}
+    t = perf_counter()
+    for n in range(frames):
+        geom.trace(frame, xy)
+    results['trace'] = (perf_counter() - t)*1e6/frames
+    t = perf_counter()
+    for n in range(frames):
+        geom.set_span(7.1 + n*1e-6, 0.048)
+        geom.freq_legends()
+    results['retune'] = (perf_counter() - t)*1e6/frames
+    t = perf_counter()
+    for n in range(frames):
+        geom.set_db_range(-140.0 + (n & 1)*10.0, 10.0, 10)
+        geom.db_legends()
+    results['range'] = (perf_counter() - t)*1e6/frames
+    return results
+
+if __name__ == '__main__':
+    bins = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    pp.pprint(benchmark(bins, width))
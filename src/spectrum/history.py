@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+#
+# history.py
+#
+# Spectrum history ring buffer for the PyConsole
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+
+Keeps the last N spectrum frames for each receiver with the time and the
+tuning at the time of the frame.
+
+All storage is allocated up front. The ring is mirrored, each frame is
+written to slot n and to slot n + depth, so the last N frames are always
+one contiguous run of rows and any time range is returned as a view with
+no copy. An append is two row writes whatever the depth.
+
+Frames can be stored as float32 dBm or quantised to bound memory at large
+widths and depths. uint8 covers the dB range in 256 steps, int16 stores
+hundredths of a dB. Use to_db() to turn stored rows back into dBm.
+
+"""
+
+#=====================================================
+# Storage types
+HIST_FLOAT32 = 'float32'
+HIST_INT16 = 'int16'
+HIST_UINT8 = 'uint8'
+
+# int16 storage resolution, steps per dB
+HIST_INT16_SCALE = 100.0
+
+#=====================================================
+# Spectrum history
+#=====================================================
+class SpectrumHistory:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, depth, width, num_rx = 1, storage = HIST_FLOAT32, db_min = -140.0, db_max = -20.0):
+        """
+        Constructor
+
+        Arguments:
+            depth   --  number of frames to keep per receiver
+            width   --  max frame width, wider frames are truncated
+            num_rx  --  number of receivers
+            storage --  HIST_FLOAT32 | HIST_INT16 | HIST_UINT8
+            db_min  --  bottom of the uint8 range in dBm
+            db_max  --  top of the uint8 range in dBm
+
+        """
+
+        self.depth = depth
+        self.width = width
+        self.storage = storage
+        self.__db_min = db_min
+        self.__db_step = (db_max - db_min)/255.0
+
+        # Mirrored storage, 2 x depth rows per receiver
+        rows = 2*depth
+        self.__data = np.zeros((num_rx, rows, width), dtype=np.dtype(storage))
+        self.__times = np.zeros((num_rx, rows), dtype=np.float64)
+        self.__freqs = np.zeros((num_rx, rows), dtype=np.float64)
+        self.__spans = np.zeros((num_rx, rows), dtype=np.float64)
+        self.__modes = np.zeros((num_rx, rows), dtype=np.int16)
+        self.__widths = np.zeros((num_rx, rows), dtype=np.int32)
+        # Frames appended for each receiver
+        self.__count = [0]*num_rx
+        # Quantising scratch row
+        self.__scratch = np.zeros(width, dtype=np.float32)
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def append(self, frame, freq, span, mode, t = None, rx = RX_1):
+        """
+        Append a frame
+
+        Arguments:
+            frame   --  spectrum in dBm
+            freq    --  centre frequency
+            span    --  display span
+            mode    --  mode from the mode set
+            t       --  frame time, defaults to now
+            rx      --  RX_1 to RX_3
+
+        """
+
+        n = rx - 1
+        slot = self.__count[n] % self.depth
+        width = min(frame.shape[0], self.width)
+        row = self.__data[n, slot]
+        if self.storage == HIST_FLOAT32:
+            row[:width] = frame[:width]
+        else:
+            q = self.__scratch[:width]
+            if self.storage == HIST_UINT8:
+                np.subtract(frame[:width], self.__db_min, out=q)
+                np.multiply(q, 1.0/self.__db_step, out=q)
+                np.clip(q, 0, 255, out=q)
+            else:
+                np.multiply(frame[:width], HIST_INT16_SCALE, out=q)
+                np.clip(q, -32768, 32767, out=q)
+            np.rint(q, out=q)
+            row[:width] = q
+        # Mirror the row and metadata
+        self.__data[n, slot + self.depth, :width] = row[:width]
+        if t == None:
+            t = monotonic()
+        for store, value in ((self.__times, t), (self.__freqs, freq), (self.__spans, span), (self.__modes, mode), (self.__widths, width)):
+            store[n, slot] = value
+            store[n, slot + self.depth] = value
+        self.__count[n] += 1
+
+    def count(self, rx = RX_1):
+        # Number of frames held
+        return min(self.__count[rx-1], self.depth)
+
+    def latest(self, frames, rx = RX_1):
+        """
+        Return the last frames, oldest first
+
+        Arguments:
+            frames  --  number of frames wanted, limited to those held
+            rx      --  RX_1 to RX_3
+
+        Returns a dict of views with keys data, times, freqs, spans, modes and widths
+
+        """
+
+        n = rx - 1
+        frames = min(frames, self.count(rx))
+        # The newest frame is in the mirror half
+        end = (self.__count[n] - 1) % self.depth + self.depth + 1
+        return self.__slice(n, end - frames, end)
+
+    def time_range(self, t_start, t_end, rx = RX_1):
+        """
+        Return the frames with t_start <= time < t_end, oldest first
+
+        Arguments:
+            t_start --  start time
+            t_end   --  end time
+            rx      --  RX_1 to RX_3
+
+        Returns a dict of views as latest()
+
+        """
+
+        n = rx - 1
+        held = self.count(rx)
+        end = (self.__count[n] - 1) % self.depth + self.depth + 1
+        times = self.__times[n, end - held:end]
+        # Times are in order so a binary search finds the range
+        first = np.searchsorted(times, t_start, side='left')
+        last = np.searchsorted(times, t_end, side='left')
+        return self.__slice(n, end - held + first, end - held + last)
+
+    def to_db(self, data):
+        """
+        Return stored rows as float32 dBm
+
+        float32 storage is returned as is, quantised storage is converted
+        into a new array.
+
+        Arguments:
+            data    --  rows from latest() or time_range()
+
+        """
+
+        if self.storage == HIST_FLOAT32:
+            return data
+        db = data.astype(np.float32)
+        if self.storage == HIST_UINT8:
+            db *= self.__db_step
+            db += self.__db_min
+        else:
+            db *= 1.0/HIST_INT16_SCALE
+        return db
+
+    def clear(self, rx = None):
+        # Forget the frames for one or all receivers
+        for n in range(len(self.__count)):
+            if rx == None or n == rx - 1:
+                self.__count[n] = 0
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __slice(self, n, start, end):
+        return {
+            'data' : self.__data[n, start:end],
+            'times' : self.__times[n, start:end],
+            'freqs' : self.__freqs[n, start:end],
+            'spans' : self.__spans[n, start:end],
+            'modes' : self.__modes[n, start:end],
+            'widths' : self.__widths[n, start:end],
+        }
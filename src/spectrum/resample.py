@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+# resample.py
+#
+# Spectrum bin to pixel resampling for the PyConsole
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+
+Maps a frame of any number of bins onto the pixels of a display so the
+library can run at a fixed resolution whatever the window size.
+
+With more bins than pixels each pixel covers a run of bins and gets the
+min and max of the run, drawn as a vertical envelope so a signal one bin
+wide is never averaged away. With fewer bins the frame is linearly
+interpolated and min and max are the same. With equal counts the frame is
+passed through.
+
+The bin ranges and interpolation positions are computed once per
+(bins, pixels) pair and the outputs are preallocated, a frame is one or
+two vectorized calls.
+
+"""
+
+#=====================================================
+# Resampler
+#=====================================================
+class Resampler:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, bins, pixels):
+        """
+        Constructor
+
+        Arguments:
+            bins    --  frame width in bins
+            pixels  --  display width in pixels
+
+        """
+
+        self.bins = bins
+        self.pixels = pixels
+        # True when each pixel covers more than one bin
+        self.envelope = bins > pixels
+        self.__min = np.zeros(pixels, dtype=np.float32)
+        self.__max = np.zeros(pixels, dtype=np.float32)
+        if self.envelope:
+            # First bin of each pixel
+            self.__starts = (np.arange(pixels, dtype=np.intp)*bins)//pixels
+        elif bins < pixels:
+            # Bin position of each pixel
+            self.__x = np.linspace(0, bins - 1, pixels)
+            self.__xp = np.arange(bins, dtype=np.float64)
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def matches(self, bins, pixels):
+        # True if this resampler is for these dimensions
+        return self.bins == bins and self.pixels == pixels
+
+    def resample(self, frame):
+        """
+        Resample a frame to the display width
+
+        Arguments:
+            frame   --  spectrum of bins values
+
+        Returns (min, max) arrays of pixels values, the same array when
+        not an envelope. The arrays are reused on the next call.
+
+        """
+
+        if self.envelope:
+            np.minimum.reduceat(frame, self.__starts, out=self.__min)
+            np.maximum.reduceat(frame, self.__starts, out=self.__max)
+            return self.__min, self.__max
+        if self.bins < self.pixels:
+            self.__max[:] = np.interp(self.__x, self.__xp, frame)
+            return self.__max, self.__max
+        return frame, frame
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+#
+# traces.py
+#
+# Averaged and hold traces for the PyConsole displays
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+
+Derived traces kept alongside the live spectrum for one receiver.
+
+TRACE_AVG is video averaging, an exponential average with a time constant
+so the smoothing does not change with the frame rate. TRACE_MAX and
+TRACE_MIN hold the highest and lowest level seen at each bin, decaying
+back towards the live trace at a fixed rate in dB per second, a rate of
+0 holds for ever.
+
+Each trace is a persistent array updated in place with a few ufunc calls,
+no array is allocated per frame. The traces restart from the live frame
+when the centre frequency, span or frame width changes as the old levels
+no longer line up with the bins.
+
+"""
+
+#=====================================================
+# Trace kinds
+TRACE_AVG = 'avg'
+TRACE_MAX = 'max'
+TRACE_MIN = 'min'
+TRACE_KINDS = (TRACE_AVG, TRACE_MAX, TRACE_MIN)
+
+# Defaults
+# Averaging time constant in seconds
+TRACE_AVG_TIME = 1.0
+# Hold decay in dB per second
+TRACE_HOLD_DECAY = 2.0
+
+#=====================================================
+# Trace set
+#=====================================================
+class TraceSet:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, avg_time = TRACE_AVG_TIME, hold_decay = TRACE_HOLD_DECAY):
+        """
+        Constructor
+
+        Arguments:
+            avg_time    --  averaging time constant in seconds
+            hold_decay  --  hold decay in dB per second, 0 for no decay
+
+        """
+
+        self.avg_time = avg_time
+        self.hold_decay = hold_decay
+        # Traces by kind, allocated on the first frame
+        self.__traces = {}
+        self.__scratch = None
+        # What the traces were built for
+        self.__key = None
+        self.__last_t = None
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def update(self, frame, freq, span, t = None):
+        """
+        Update the traces with a new frame
+
+        Arguments:
+            frame   --  spectrum in dBm
+            freq    --  centre frequency
+            span    --  display span
+            t       --  frame time, defaults to now
+
+        """
+
+        if t == None:
+            t = monotonic()
+        key = (freq, span, frame.shape[0])
+        if key != self.__key:
+            self.__restart(frame, key, t)
+            return
+        dt = max(0.0, t - self.__last_t)
+        self.__last_t = t
+        avg = self.__traces[TRACE_AVG]
+        hold_max = self.__traces[TRACE_MAX]
+        hold_min = self.__traces[TRACE_MIN]
+        # avg += (1 - e^(-dt/tau))*(frame - avg)
+        if self.avg_time > 0:
+            alpha = 1.0 - np.exp(-dt/self.avg_time)
+            np.subtract(frame, avg, out=self.__scratch)
+            np.multiply(self.__scratch, alpha, out=self.__scratch)
+            np.add(avg, self.__scratch, out=avg)
+        else:
+            avg[:] = frame
+        # Decay the holds towards the frame then hold the new extremes
+        if self.hold_decay > 0:
+            np.subtract(hold_max, self.hold_decay*dt, out=hold_max)
+            np.add(hold_min, self.hold_decay*dt, out=hold_min)
+        np.maximum(hold_max, frame, out=hold_max)
+        np.minimum(hold_min, frame, out=hold_min)
+
+    def get(self, kind):
+        # The trace array for kind or None before the first frame
+        return self.__traces.get(kind)
+
+    def reset(self):
+        # Restart all traces from the next frame
+        self.__key = None
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __restart(self, frame, key, t):
+        width = frame.shape[0]
+        if self.__scratch is None or self.__scratch.shape[0] != width:
+            for kind in TRACE_KINDS:
+                self.__traces[kind] = np.zeros(width, dtype=np.float32)
+            self.__scratch = np.zeros(width, dtype=np.float32)
+        for kind in TRACE_KINDS:
+            self.__traces[kind][:] = frame
+        self.__key = key
+        self.__last_t = t
@@ -49,8 +49,8 @@ class Modes(ButtonBase):
         # radio id
         self.__id = id
         
-        # Get the connector instance
-        self.__con = getInstance('interface_inst')
+        # Get the dispatcher instance
+        self.__con = getInstance('dispatcher_inst')
         
         # Add mode buttons
         self.__btns = (
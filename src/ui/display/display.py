@@ -26,31 +26,46 @@
 # Import all
 from main.imports import *
 
+# Bottom of the fixed dB scale
+PAN_ST_DB = -140.0
+# Deepest zoom and the zoom step for one wheel notch
+PAN_ZOOM_MAX = 64.0
+PAN_ZOOM_STEP = 1.25
+# Pixels the mouse must move with the button down to pan rather than click tune
+PAN_DRAG_MIN = 3
+
 """
 	Panadapter display for one receiver.
 	Multi-instance for each active receiver.
 	The widget is placed within the display window for display.
+
+	Frames are rendered to an image by a PanRenderer on a RenderWorker
+	thread. The GUI thread snapshots the display settings with each new
+	frame, swaps in each finished image and draws the cursor over it.
 """
 class Panadapter(QWidget):
-	
+
+	# Emitted from the render worker when an image is ready
+	frameReady = pyqtSignal()
+
 	def __init__(self, rx_id, width, height, freq_callback):
 		"""
 		Constructor
-		
+
 		Arguments:
 			rx_id			--	RX ID this display belongs to
 			width			-- 	Full display area width
 			height			--	Full display area height
 			freq_callback	--	callback for click tune
 		"""
-		
+
 		super(Panadapter, self).__init__()
-		
+
 		self.__rx_id = rx_id
 		self.__width = width
 		self.__height = height
 		self.__freq_callback = freq_callback
-		
+
 		# Set the back colour
 		palette = QPalette()
 		palette.setColor(QPalette.Background,QColor(43,63,68,255))
@@ -59,235 +74,586 @@ class Panadapter(QWidget):
 		# Initialise vars
 		self.__center_freq = 7.1
 		self.__bandwidth = 0.048
-		self.__half_bandwidth = 0.048/2.0
 		self.__filter_low = -2700
 		self.__filter_high = -300
 		self.__mouse_x = 0
 		self.__mouse_y = 0
 		self.__show_freq = False
+		# Pixel to frequency transform, freq = x_offset + fpp*x
+		self.__fpp = 0.0
+		self.__x_offset = 0.0
+		# Part of the span shown as (start, end) fractions, and drag state
+		self.__view = (0.0, 1.0)
+		self.__drag_x = None
+		self.__drag_view = None
+		self.__dragged = False
 		# Drawing params
 		self.__top_border = 10
 		self.__left_border = 50
 		self.__right_border = 10
 		self.__bottom_border = 25
-		self.__h_text_base = 40
-		self.__h_text_left = 35
-		self.__v_text_left = 8
-		self.__h_no = 11
 		self.__pixels = None
-		# Display ref and data holding
+		# Display ref
 		self.__display_ob = None
-		self.__display_data = None
-		
+		self.__waterfall = None
+		# Frame tracking, last frame sequence rendered and counters
+		self.__frame_seq = 0
+		self.__frames_rendered = 0
+		self.__frames_dropped = 0
+		# Trace settings, the generation is bumped to restart the traces
+		self.__overlays = []
+		self.__avg_time = TRACE_AVG_TIME
+		self.__hold_decay = TRACE_HOLD_DECAY
+		self.__trace_gen = 0
+		# Follow the noise floor with the dB scale
+		self.__auto_range = Model.get_app_model().get('AUTO_RANGE', False)
+
 		# Set the resources
-		self.__grid_pen = QPen(QColor(39,83,109))
-		self.__grid_pen.setWidth(1)
-		self.__grid_pen.setStyle(Qt.DotLine)
-		self.__legend_pen = QPen(QColor(178,178,178))
-		self.__legend_pen.setWidth(1)
-		self.__label_pen = QPen(QColor(255,0,0))
-		self.__label_pen.setWidth(1)
-		self.__filter_pen = QPen(QColor(0,255,0, 20))
-		self.__filter_pen.setWidth(1)
-		self.__filter_brush = QBrush(QColor(0,255,0, 20))
-		self.__freq_pen = QPen(QColor(255,0,0))
-		self.__freq_pen.setWidth(1)
-		self.__data_pen = QPen(QColor(0,255,0))
-		self.__data_pen.setWidth(1)
-		self.__font = QFont('Times', 8)
-		
-		# Define the painter paths
-		self.__painter_paths = {
-			'grid': [[QPainterPath(), self.__grid_pen, None],],
-			'legend': [[QPainterPath(), self.__legend_pen, None],],
-			'label': [[QPainterPath(), self.__label_pen, None],],
-			'dynamic': [
-					[QPainterPath(), self.__filter_pen, self.__filter_brush],
-					[QPainterPath(), self.__freq_pen, None]
-				],
-			'data': [[QPainterPath(), self.__data_pen, None],]
-		}
+		self.__cursor_pen = QPen(QColor(255,0,0,120))
+		self.__cursor_pen.setWidth(1)
+		# The latest finished image
+		self.__image = None
+		# Mean paint time in seconds
+		self.__paint_time = 0.0
+		# Click tune waits out the double click interval so a double click does not tune
+		self.__tune_freq = None
+		self.__tune_timer = QTimer(self)
+		self.__tune_timer.setSingleShot(True)
+		self.__tune_timer.timeout.connect(self.__clickTune)
 		# Enable mouseMoveEvent()
 		self.setMouseTracking(True)
-		
+
 		# Create a label for showing freq at cursor
 		self.__freq_disp = QLabel('', self)
 		self.__freq_disp.setStyleSheet("QLabel {color: rgb(255,0,0);  font: bold 12px}")
 		self.__freq_disp.setText('')
-		
+		self.__freq_disp.resize(60, 20)
+
 		# Get the connector instance
 		self.__con = getInstance('interface_inst')
-		
+
+		# Render frames off the GUI thread
+		self.__renderer = PanRenderer(self.__top_border, self.__left_border, self.__right_border, self.__bottom_border)
+		self.__worker = RenderWorker(self.__renderer.render, self.frameReady.emit, 'render-rx%d' % rx_id)
+		self.frameReady.connect(self.__onFrameReady)
+
 		# Set display
 		self.__pixels = width - self.__left_border - self.__right_border
-		#self.__con.set_display(rx_id, self.__pixels)
-		self.__con.set_disp_width(self.__pixels)
-		
-		# Refresh display every IDLE_TICKER ms
-		QTimer.singleShot(IDLE_TICKER, self.timerEvent)
-	
+		self.__setDispWidth()
+		self.__makeTransform()
+
+		# Refresh display at the scheduler rate
+		self.__scheduler = getInstance('scheduler_inst')
+		self.__scheduler.add(self.timerEvent)
+
 	#===========================================================================================
 	# PUBLIC
-		
+
 	def setCenterFreq(self, freq):
 		self.__center_freq = freq
-		self.__makePainterPaths()
-	
+		self.__makeTransform()
+
 	def setBandwidth(self, bandwidth):
 		self.__bandwidth = bandwidth
-		self.__half_bandwidth = bandwidth/2.0
-		self.__makePainterPaths()
-		
+		self.__makeTransform()
+
 	def setFilterLimits(self, filter_low, filter_high):
 		self.__filter_low = float(filter_low)/1000000.0
 		self.__filter_high = float(filter_high)/1000000.0
-		self.__makePainterPaths()
-		
+
+	def getFrameStats(self):
+		# Return (frames rendered, frames dropped)
+		return self.__frames_rendered, self.__frames_dropped + self.__worker.getStats()['dropped']
+
+	def getPaintTime(self):
+		# Return the mean paint time in ms
+		return self.__paint_time*1000.0
+
+	def getRenderStats(self):
+		# Return the render worker statistics
+		return self.__worker.getStats()
+
+	def setTrace(self, kind, enable):
+		# Show or hide an averaged or hold trace, it starts again when shown
+		overlays = [k for k in self.__overlays if k != kind]
+		if enable:
+			overlays.append(kind)
+		self.__overlays = overlays
+		self.__trace_gen += 1
+
+	def setAvgTime(self, seconds):
+		# Averaging time constant
+		self.__avg_time = seconds
+
+	def setHoldDecay(self, db_per_sec):
+		# Hold decay rate, 0 holds for ever
+		self.__hold_decay = db_per_sec
+
+	def setAutoRange(self, enable):
+		# Follow the noise floor or use the fixed dB scale
+		self.__auto_range = enable
+
+	def setWaterfall(self, waterfall):
+		# Waterfall to feed with each new frame
+		self.__waterfall = waterfall
+
+	def setZoom(self, zoom, x = None):
+		""" Show 1/zoom of the span keeping the frequency at pixel x in place, the centre by default """
+		zoom = min(max(zoom, 1.0), PAN_ZOOM_MAX)
+		if x == None:
+			x = self.__left_border + self.__pixels/2
+		start, end = self.__view
+		rel = min(max(float(x - self.__left_border)/self.__pixels, 0.0), 1.0)
+		anchor = start + (end - start)*rel
+		width = 1.0/zoom
+		self.__setView(anchor - rel*width, width)
+
+	def getZoom(self):
+		return 1.0/(self.__view[1] - self.__view[0])
+
+	def terminate(self):
+		# Stop refreshing and stop the render worker, called when the window closes
+		self.__scheduler.remove(self.timerEvent)
+		self.__tune_timer.stop()
+		self.__worker.terminate()
+
 	#===========================================================================================
 	# Qt EVENTS
-	
+
 	def resizeEvent(self, e):
 		# Save change
 		self.__width = e.size().width()
 		self.__height = e.size().height()
 		self.__pixels = self.__width - self.__left_border - self.__right_border
 		# Tell server width has changed
-		# This changes the number of pixels returned to match the width
-		self.__con.set_disp_width(self.__pixels)
-		
+		self.__setDispWidth()
+		self.__makeTransform()
+
 	def paintEvent(self, e):
+		t = perf_counter()
 		# Paint context
 		qp = QPainter()
 		qp.begin(self)
-		qp.setRenderHints(QPainter.Antialiasing)
-		# Paint according to the definition
-		self.__freq_disp.setGeometry(self.__mouse_x, self.__mouse_y, 50, 20)
-		for key, value in self.__painter_paths.items():
-			for (path, pen, brush) in value:
-				if pen != None: qp.setPen(pen)
-				if brush != None: qp.setBrush(brush)
-				qp.drawPath(path)
+		# Blit the latest image, only the invalid part for a cursor move
+		if self.__image != None:
+			r = e.rect()
+			qp.drawImage(r, self.__image, r)
+		# Cursor crosshair
+		if self.__show_freq:
+			qp.setPen(self.__cursor_pen)
+			qp.drawLine(self.__mouse_x, 0, self.__mouse_x, self.__height)
+			qp.drawLine(0, self.__mouse_y, self.__width, self.__mouse_y)
 		qp.end()
-		
-	def mouseMoveEvent(self, e):		
-		# Display a frequency label at the cursor position.
-		self.__mouse_x = e.x() + 10
-		self.__mouse_y = e.y() - 10
-		#self.__freq_disp.setText('{:.3f}'.format(self.__st_freq + (self.__fpp*(e.x() - self.__left_border))))
-		self.update()
-	
+		self.__paint_time += 0.1*((perf_counter() - t) - self.__paint_time)
+
+	def mouseMoveEvent(self, e):
+		# Display a frequency label and crosshair at the cursor position.
+		# Only the strips the crosshair leaves and enters are repainted,
+		# the label is a child widget and Qt repaints what it uncovers.
+		if self.__drag_x != None and abs(e.x() - self.__drag_x) >= PAN_DRAG_MIN:
+			# Drag the view with the mouse
+			self.__dragged = True
+			start, end = self.__drag_view
+			self.__setView(start - (end - start)*float(e.x() - self.__drag_x)/self.__pixels, end - start)
+		old = self.__cursorRegion()
+		self.__mouse_x = e.x()
+		self.__mouse_y = e.y()
+		self.__freq_disp.setText('{:.4f}'.format(self.__xToFreq(e.x())))
+		self.__freq_disp.move(e.x() + 10, e.y() - 20)
+		self.update(old.united(self.__cursorRegion()))
+
 	def enterEvent(self, e):
+		self.__show_freq = True
 		self.__freq_disp.show()
-		
+
 	def leaveEvent(self, e):
 		self.__freq_disp.hide()
-		
+		old = self.__cursorRegion()
+		self.__show_freq = False
+		self.update(old)
+
 	def mousePressEvent(self, e):
-		freq = self.__st_freq + (self.__fpp*(e.x() - self.__left_border))
-		self.__freq_callback(freq)
-	
+		# Could be a click tune or the start of a drag
+		if e.button() == Qt.LeftButton:
+			self.__drag_x = e.x()
+			self.__drag_view = self.__view
+			self.__dragged = False
+
+	def mouseReleaseEvent(self, e):
+		if e.button() == Qt.LeftButton and self.__drag_x != None:
+			if not self.__dragged:
+				self.__tune_freq = self.__xToFreq(e.x())
+				self.__tune_timer.start(QApplication.doubleClickInterval())
+			self.__drag_x = None
+
+	def mouseDoubleClickEvent(self, e):
+		# Back to the full span, the first click of the pair does not tune
+		self.__tune_timer.stop()
+		self.__setView(0.0, 1.0)
+
+	def contextMenuEvent(self, e):
+		# Turn the averaged and hold traces on and off
+		menu = QMenu(self)
+		for kind, text in ((TRACE_AVG, 'Average'), (TRACE_MAX, 'Max hold'), (TRACE_MIN, 'Min hold')):
+			action = menu.addAction(text)
+			action.setCheckable(True)
+			action.setChecked(kind in self.__overlays)
+			action.toggled.connect(lambda checked, kind=kind: self.setTrace(kind, checked))
+		menu.addSeparator()
+		menu.addAction('Reset traces', self.__resetTraces)
+		menu.exec_(e.globalPos())
+
+	def wheelEvent(self, e):
+		# Zoom about the cursor
+		self.setZoom(self.getZoom()*(PAN_ZOOM_STEP**(e.angleDelta().y()/120.0)), e.pos().x())
+
 	def timerEvent(self):
 		""" Process any waiting update """
-		# Make context for rendering
 		# Get data if ready
-		self.__display_data = self.__con.get_disp_data()
-		#print(r,self.__display_data)
-		#if r:
-		# Render
-		self.__makePainterPaths()
-		self.__process_pan_data()
-		# Force a paint
+		if self.__con.has_new_frame(self.__frame_seq):
+			seq = self.__con.disp_seq
+			# Any gap in the sequence is frames we never rendered
+			if self.__frame_seq > 0:
+				self.__frames_dropped += seq - self.__frame_seq - 1
+			self.__frame_seq = seq
+			# Hand a copy of the frame and the settings to the worker
+			self.__worker.submit({
+				'frame' : self.__con.get_rx_snapshot(self.__rx_id, Model.get_num_rx()),
+				'width' : self.__width,
+				'height' : self.__height,
+				'center_freq' : self.__center_freq,
+				'bandwidth' : self.__bandwidth,
+				'filter_low' : self.__filter_low,
+				'filter_high' : self.__filter_high,
+				'overlays' : self.__overlays,
+				'avg_time' : self.__avg_time,
+				'hold_decay' : self.__hold_decay,
+				'trace_gen' : self.__trace_gen,
+				'auto_range' : self.__auto_range,
+				'view' : self.__view,
+				'waterfall' : self.__waterfall,
+				'waterfall_params' : self.__waterfall.getRowParams() if self.__waterfall != None else None,
+			})
+
+	def __onFrameReady(self):
+		""" Swap in the latest image, on the GUI thread """
+		result = self.__worker.take()
+		if result == None:
+			return
+		image, row, transform = result
+		if image.width() != self.__width or image.height() != self.__height:
+			# Rendered before a resize, the next frame will fit
+			return
+		self.__image = image
+		# The cursor follows exactly what is shown
+		self.__x_offset, self.__fpp = transform
+		if row is not None:
+			self.__waterfall.addRow(row)
+		self.__frames_rendered += 1
+		# The worker time counts against the frame budget
+		self.__scheduler.reportRenderTime(self.__worker.getStats()['render_ms']/1000.0)
 		self.update()
-		
-		# Call again in IDLE_TICKER ms
-		QTimer.singleShot(IDLE_TICKER, self.timerEvent)
 
 	#===========================================================================================
 	# PRIVATE
-	
+
+	def __setView(self, start, width):
+		""" Show width of the span from start, as fractions of the span """
+		width = min(max(width, 1.0/PAN_ZOOM_MAX), 1.0)
+		start = min(max(start, 0.0), 1.0 - width)
+		self.__view = (start, start + width)
+		self.__makeTransform()
+
+	def __makeTransform(self):
+		""" Cache the pixel to frequency transform for the cursor and click tune until the next image """
+		if self.__pixels <= 0:
+			return
+		start, end = self.__view
+		self.__fpp = float(self.__bandwidth*(end - start))/float(self.__pixels)
+		self.__x_offset = (self.__center_freq - self.__bandwidth/2.0 + self.__bandwidth*start) - (self.__fpp*self.__left_border)
+
+	def __xToFreq(self, x):
+		""" Frequency at pixel x """
+		return self.__x_offset + (self.__fpp*x)
+
+	def __cursorRegion(self):
+		""" Region covered by the crosshair """
+		if not self.__show_freq:
+			return QRegion()
+		return QRegion(self.__mouse_x - 1, 0, 3, self.__height).united(QRegion(0, self.__mouse_y - 1, self.__width, 3))
+
+	def __setDispWidth(self):
+		""" Ask for a fixed resolution frame, or one bin per pixel """
+		bins = DISP_BINS if DISP_BINS > 0 else self.__pixels
+		self.__con.set_disp_width(bins, self.__rx_id)
+
+	def __clickTune(self):
+		""" No double click followed, tune to the frequency clicked """
+		self.__freq_callback(self.__tune_freq)
+
+	def __resetTraces(self):
+		""" Start the traces again from the next frame """
+		self.__trace_gen += 1
+
+"""
+	Renders panadapter frames to images.
+	Runs on the render worker thread, everything it needs comes with the
+	job so it shares no state with the GUI thread.
+"""
+class PanRenderer:
+
+	def __init__(self, top_border, left_border, right_border, bottom_border):
+		"""
+		Constructor
+
+		Arguments:
+			top_border		--	borders around the trace area in pixels
+			left_border		--
+			right_border	--
+			bottom_border	--
+		"""
+
+		# Drawing params
+		self.__top_border = top_border
+		self.__left_border = left_border
+		self.__right_border = right_border
+		self.__bottom_border = bottom_border
+		self.__h_text_base = 40
+		self.__h_text_left = 35
+		self.__v_text_left = 8
+		self.__h_no = 11
+		self.__db_step = 10.0
+		self.__st_db = PAN_ST_DB
+		self.__width = 0
+		self.__height = 0
+		self.__center_freq = 0.0
+		self.__half_bandwidth = 0.0
+
+		# Set the resources
+		self.__back_color = QColor(43,63,68,255)
+		self.__grid_pen = QPen(QColor(39,83,109))
+		self.__grid_pen.setWidth(1)
+		self.__grid_pen.setStyle(Qt.DotLine)
+		self.__legend_pen = QPen(QColor(178,178,178))
+		self.__legend_pen.setWidth(1)
+		self.__label_pen = QPen(QColor(255,0,0))
+		self.__label_pen.setWidth(1)
+		self.__filter_pen = QPen(QColor(0,255,0, 20))
+		self.__filter_pen.setWidth(1)
+		self.__filter_brush = QBrush(QColor(0,255,0, 20))
+		self.__freq_pen = QPen(QColor(255,0,0))
+		self.__freq_pen.setWidth(1)
+		self.__data_pen = QPen(QColor(0,255,0))
+		self.__data_pen.setWidth(1)
+		self.__font = QFont('Times', 8)
+
+		# Define the painter paths
+		# The static paths are rendered once into a cached image
+		self.__painter_paths = {
+			'grid': [[QPainterPath(), self.__grid_pen, None],],
+			'legend': [[QPainterPath(), self.__legend_pen, None],],
+			'label': [[QPainterPath(), self.__label_pen, None],],
+		}
+		# The dynamic paths are cheap and drawn every frame
+		self.__dynamic_paths = [
+			[QPainterPath(), self.__filter_pen, self.__filter_brush],
+			[QPainterPath(), self.__freq_pen, None]
+		]
+		# Static layer cache, rendered again when the size or dB range changes
+		self.__static_layer = None
+		# Transforms, grid, legend values and trace coordinates
+		self.__geom = SpecGeometry(left_border, right_border, top_border, bottom_border)
+		# The bins in view and the frequency legends for them
+		self.__view = None
+		self.__freq_legends = []
+		# The trace is a single polyline drawn from a preallocated buffer
+		self.__trace = None
+		self.__trace_xy = None
+		self.__trace_key = None
+		# Averaged and hold traces drawn as extra polylines
+		self.__traces = TraceSet()
+		self.__trace_gen = 0
+		# Noise floor tracking for auto range
+		self.__auto = AutoRange(self.__db_step*(self.__h_no - 1), self.__db_step, PAN_ST_DB)
+		self.__overlays = {
+			TRACE_AVG: [None, None, QPen(QColor(255,255,255))],
+			TRACE_MAX: [None, None, QPen(QColor(255,128,0))],
+			TRACE_MIN: [None, None, QPen(QColor(0,128,255))],
+		}
+
+	#===========================================================================================
+	# PUBLIC
+
+	def render(self, job):
+		"""
+		Render a frame
+
+		Arguments:
+			job		--	dict of the frame and the display settings
+
+		Returns (image, waterfall row or None, (x_offset, fpp))
+		"""
+
+		data = job['frame']
+		self.__width = job['width']
+		self.__height = job['height']
+		self.__center_freq = job['center_freq']
+		self.__half_bandwidth = job['bandwidth']/2.0
+		geom = self.__geom
+		resized = geom.set_size(self.__width, self.__height, int(self.__width/50))
+		if geom.pixels <= 0 or self.__height <= 0:
+			return None
+		# The bins in view, the frame is in drawing order
+		bins = data.shape[0]
+		start, end = job['view']
+		first = min(int(start*bins), bins - 2)
+		last = max(int(np.ceil(end*bins)), first + 2)
+		self.__view = slice(first, last)
+		if geom.set_span(self.__center_freq, job['bandwidth'], first, last, bins) or resized:
+			self.__makeFreqLegends()
+		# The scale moves in whole grid steps and only past the hysteresis
+		if job['auto_range']:
+			self.__st_db = self.__auto.update(data)
+		else:
+			self.__st_db = PAN_ST_DB
+		# The static layer only when something has changed
+		if geom.set_db_range(self.__st_db, self.__db_step, self.__h_no - 1) or resized or self.__static_layer is None:
+			self.__makePainterPaths()
+		self.__makeDynamicPaths(job['filter_low'], job['filter_high'])
+		self.__process_pan_data(data[self.__view])
+		overlays = job['overlays']
+		if len(overlays) > 0:
+			if job['trace_gen'] != self.__trace_gen:
+				self.__trace_gen = job['trace_gen']
+				self.__traces.reset()
+			self.__traces.avg_time = job['avg_time']
+			self.__traces.hold_decay = job['hold_decay']
+			self.__processTraces(data, overlays, job['bandwidth'])
+
+		# Compose the image, a new one each frame as the GUI may still hold the last
+		image = QImage(self.__width, self.__height, QImage.Format_ARGB32_Premultiplied)
+		image.fill(self.__back_color)
+		qp = QPainter(image)
+		qp.setRenderHints(QPainter.Antialiasing)
+		qp.drawImage(0, 0, self.__static_layer)
+		qp.setPen(self.__legend_pen)
+		qp.setFont(self.__font)
+		for (point, text) in self.__freq_legends:
+			qp.drawText(point, text)
+		for (path, pen, brush) in self.__dynamic_paths:
+			if pen != None: qp.setPen(pen)
+			if brush != None: qp.setBrush(brush)
+			qp.drawPath(path)
+		# Traces, live trace on top
+		for kind in overlays:
+			poly, xy, pen = self.__overlays[kind]
+			qp.setPen(pen)
+			qp.drawPolyline(poly)
+		qp.setPen(self.__data_pen)
+		qp.drawPolyline(self.__trace)
+		qp.end()
+
+		# Waterfall row, the same bins as the trace
+		row = None
+		if job['waterfall'] != None:
+			row = job['waterfall'].makeRow(data[self.__view], job['waterfall_params'])
+		return image, row, (geom.x_to_freq(0), geom.fpp)
+
+	#===========================================================================================
+	# PRIVATE
+
 	def __makePainterPaths(self):
-		# Set up the context to calculate the paths 
-		v_no = int(self.__width/50)
-		self.__h_space = self.__width - self.__left_border - self.__right_border
-		h_step = self.__h_space/(v_no)
-		self.__v_space = self.__height - self.__top_border - self.__bottom_border
-		v_step = self.__v_space/(self.__h_no-1)
-		self.__h_text_base = self.__top_border + self.__v_space + 15
-		
-		# Frequency calculations
-		center_freq = self.__center_freq
-		self.__st_freq = center_freq - self.__half_bandwidth
-		end_freq = center_freq + self.__half_bandwidth
-		span = end_freq - self.__st_freq
-		f_span_step = float(span)/float(v_no)
-		self.__fpp = float(self.__half_bandwidth * 2.0)/float(self.__h_space)
-		center_freq_x = int(float(self.__left_border) + ((center_freq - self.__st_freq)/self.__fpp))
-		
-		# Filter calculations
-		filter_low_x = int(float(self.__left_border) + (((center_freq - self.__st_freq) + self.__filter_low)/self.__fpp))
-		filter_high_x = int(float(self.__left_border) + (((center_freq - self.__st_freq) + self.__filter_high)/self.__fpp))
-		
-		# db calculations
-		self.__st_db = -140.0
-		db_span_step = 10.0
-		db_range = db_span_step * (self.__h_no - 1)
-		self.__dbpp = float(float(self.__v_space)/db_range)
-		
-		# Clear (except data) and assign the painter paths
+		geom = self.__geom
+		self.__h_text_base = self.__top_border + geom.v_space + 15
+
+		# Clear and assign the painter paths
 		for key, value in self.__painter_paths.items():
 			for path in value:
-				if key != 'data':
-					path[0] = QPainterPath()
+				path[0] = QPainterPath()
 		grid_path = self.__painter_paths['grid'][0][0]
 		legend_path = self.__painter_paths['legend'][0][0]
 		label_path = self.__painter_paths['label'][0][0]
-		filter_path = self.__painter_paths['dynamic'][0][0]
-		freq_path = self.__painter_paths['dynamic'][1][0]
-		
+
 		# Create the grid
-		for n in range (self.__h_no):
-			grid_path.moveTo(*(self.__left_border, (v_step*n) + self.__top_border))
-			grid_path.lineTo(*(self.__left_border + self.__h_space,  (v_step*n) + self.__top_border))
-		for n in range (v_no+1):
-			grid_path.moveTo(*((h_step*n) + self.__left_border, self.__top_border))
-			grid_path.lineTo(*((h_step*n) + self.__left_border, self.__top_border + self.__v_space))
-			
-		# Create the legends
-		for n in range (v_no):
-			# Frequency
-			legend_path.addText(QPointF(float(((h_step*n) + self.__h_text_left)), float(self.__h_text_base)), self.__font, "{:7.3f}".format(self.__st_freq+(n*f_span_step)))		
-		for n in range (1, self.__h_no):
+		for lines in (geom.h_lines(), geom.v_lines()):
+			for x0, y0, x1, y1 in lines.tolist():
+				grid_path.moveTo(x0, y0)
+				grid_path.lineTo(x1, y1)
+
+		# Create the legends, frequency legends follow the view and are drawn each frame
+		for y, db in geom.db_legends()[1:]:
 			# dBM
-			legend_path.addText(QPointF(float(self.__v_text_left), float(self.__top_border + self.__v_space - (v_step*n))), self.__font, "{:5.1f}".format(self.__st_db+(n*db_span_step)))
-		
+			legend_path.addText(QPointF(float(self.__v_text_left), y), self.__font, "{:5.1f}".format(db))
+
 		# Additional text
 		label_path.addText(QPointF(10, float(self.__h_text_base - 20)), self.__font, 'dbM')
-		label_path.addText(QPointF(float(self.__left_border + self.__h_space - 20), float(self.__h_text_base)), self.__font, 'MHz')
-		
-		# Dynamic data
-		filter_path.addRect(filter_low_x, self.__top_border, filter_high_x - filter_low_x, self.__v_space)
-		freq_path.moveTo(*(center_freq_x, self.__top_border))		
-		freq_path.lineTo(*(center_freq_x, self.__top_border + self.__v_space))
-	
-	def __process_pan_data(self):
-		""" Process and write the display data  """
-		self.__painter_paths['data'][0][0] = QPainterPath()
-		data_path = self.__painter_paths['data'][0][0]
-		#data_path.moveTo(*(self.__left_border, self.height() - self.__bottom_border))
-		data_path.moveTo(*(self.__left_border, self.__dbToY(self.__display_data[self.__pixels-1])))
-		data_path.lineTo(*(self.__left_border, self.__dbToY(self.__display_data[self.__pixels-1])))
-		index = self.__pixels-2
-		for x_coord in range(self.__left_border + 1, self.__left_border + self.__h_space):
-			data_path.lineTo(*(x_coord, self.__dbToY(self.__display_data[index])))
-			if index > 0:
-				index -= 1
-		self.__display_data = None
-				
-	def __dbToY(self, dbm):
-		
-		# Not sure how to offset and scale this
-		#rel_db = (abs(self.__st_db) - abs(int(dbm))) + 150
-		rel_db = (abs(self.__st_db) - abs(int(dbm)))
-		return (self.__top_border + self.__v_space) - (rel_db * self.__dbpp)
-
-		
\ No newline at end of file
+		label_path.addText(QPointF(float(self.__left_border + geom.pixels - 20), float(self.__h_text_base)), self.__font, 'MHz')
+
+		# Render the static layer once
+		self.__static_layer = QImage(self.__width, self.__height, QImage.Format_ARGB32_Premultiplied)
+		self.__static_layer.fill(Qt.transparent)
+		qp = QPainter(self.__static_layer)
+		qp.setRenderHints(QPainter.Antialiasing)
+		for key, value in self.__painter_paths.items():
+			for (path, pen, brush) in value:
+				if pen != None: qp.setPen(pen)
+				if brush != None: qp.setBrush(brush)
+				qp.drawPath(path)
+		qp.end()
+
+	def __makeFreqLegends(self):
+		""" Make the frequency legends at the vertical grid lines, more places as the zoom deepens """
+		geom = self.__geom
+		places = geom.freq_places()
+		base = float(self.__height - self.__bottom_border + 15)
+		self.__freq_legends = []
+		for x, freq in geom.freq_legends()[:-1]:
+			self.__freq_legends.append((QPointF(x - self.__left_border + self.__h_text_left, base), "{:7.{}f}".format(freq, places)))
+
+	def __makeDynamicPaths(self, filter_low, filter_high):
+		# Filter and centre frequency overlays
+		geom = self.__geom
+		center_freq = self.__center_freq
+		center_freq_x = int(geom.freq_to_x(center_freq))
+		filter_low_x = int(geom.freq_to_x(center_freq + filter_low))
+		filter_high_x = int(geom.freq_to_x(center_freq + filter_high))
+		filter_path = QPainterPath()
+		freq_path = QPainterPath()
+		filter_path.addRect(filter_low_x, self.__top_border, filter_high_x - filter_low_x, geom.v_space)
+		freq_path.moveTo(*(center_freq_x, self.__top_border))
+		freq_path.lineTo(*(center_freq_x, self.__top_border + geom.v_space))
+		self.__dynamic_paths[0][0] = filter_path
+		self.__dynamic_paths[1][0] = freq_path
+
+	def __makeTrace(self, points):
+		""" Allocate the trace polyline with points points """
+		self.__trace, self.__trace_xy = self.__makePolyline(points)
+		# Overlays have one point per pixel
+		for layer in self.__overlays.values():
+			layer[0], layer[1] = self.__makePolyline(self.__geom.pixels)
+
+	def __makePolyline(self, points):
+		""" Return a polyline and an (n, 2) array of x, y over its points """
+		poly = QPolygonF([QPointF()]*points)
+		ptr = poly.data()
+		ptr.setsize(points*2*8)
+		xy = np.frombuffer(ptr, dtype=np.float64).reshape(points, 2)
+		# The x coordinates never change
+		self.__geom.trace_x(xy)
+		return poly, xy
+
+	def __process_pan_data(self, data):
+		""" Process and write the display data, the bins in view in drawing order """
+		geom = self.__geom
+		points = geom.trace_points(data.shape[0])
+		if (geom.pixels, points) != self.__trace_key:
+			self.__trace_key = (geom.pixels, points)
+			self.__makeTrace(points)
+		geom.trace(data, self.__trace_xy)
+
+	def __processTraces(self, data, overlays, bandwidth):
+		""" Update the averaged and hold traces and write their polylines """
+		self.__traces.update(data, self.__center_freq, bandwidth)
+		for kind in overlays:
+			xy = self.__overlays[kind][1]
+			self.__geom.trace(self.__traces.get(kind)[self.__view], xy, low=(kind == TRACE_MIN))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+#
+# render.py
+#
+# Background render worker for the SDRLibEConsole displays
+#
+# Copyright (C) 2020 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+	Runs a render function on a worker thread.
+
+	There is one job slot and one result slot, both latest wins. A job
+	submitted while another is waiting replaces it and counts as dropped,
+	so when rendering falls behind the worker always starts on the newest
+	frame and never works through a backlog. The ready callback is called
+	on the worker thread when a result is available, it would normally emit
+	a Qt signal so the GUI thread calls take() and swaps the result in.
+	Once terminated nothing more is delivered, a render finishing after
+	terminate() is dropped and take() returns None.
+"""
+class RenderWorker:
+
+	def __init__(self, render, ready, name = 'render'):
+		"""
+		Constructor
+
+		Arguments:
+			render	--	render(job) returns the result, called on the worker
+			ready	--	ready() called on the worker when a result is waiting
+			name	--	thread name
+		"""
+
+		self.__render = render
+		self.__ready = ready
+		self.__job = None
+		self.__result = None
+		self.__terminate = False
+		# Counters and mean render time in seconds
+		self.__submitted = 0
+		self.__rendered = 0
+		self.__dropped = 0
+		self.__render_time = 0.0
+		self.__cond = threading.Condition()
+
+		self.__thread = threading.Thread(target=self.__run, name=name, daemon=True)
+		self.__thread.start()
+
+	#===========================================================================================
+	# PUBLIC
+
+	def submit(self, job):
+		""" Submit a job, replacing any job not yet started """
+		with self.__cond:
+			self.__submitted += 1
+			if self.__job != None:
+				self.__dropped += 1
+			self.__job = job
+			self.__cond.notify_all()
+
+	def take(self):
+		""" Return the latest result or None if there is no new result """
+		with self.__cond:
+			result = self.__result
+			self.__result = None
+			return result
+
+	def getStats(self):
+		""" Return the worker statistics dict """
+		with self.__cond:
+			return {
+				'submitted' : self.__submitted,
+				'rendered' : self.__rendered,
+				'dropped' : self.__dropped,
+				'render_ms' : self.__render_time*1000.0,
+			}
+
+	def terminate(self):
+		""" Stop the worker and wait for it, a job in progress is completed and dropped """
+		with self.__cond:
+			self.__terminate = True
+			self.__job = None
+			self.__cond.notify_all()
+		self.__thread.join()
+		with self.__cond:
+			# A ready signal still queued for the GUI finds nothing to take
+			self.__result = None
+
+	#===========================================================================================
+	# PRIVATE
+
+	def __run(self):
+		while True:
+			with self.__cond:
+				self.__cond.wait_for(lambda: self.__job != None or self.__terminate)
+				if self.__terminate:
+					return
+				job = self.__job
+				self.__job = None
+			t = perf_counter()
+			try:
+				result = self.__render(job)
+			except Exception as e:
+				print('Exception in render worker [%s][%s]' % (str(e), traceback.format_exc()))
+				continue
+			with self.__cond:
+				if self.__terminate:
+					# Finished after the display was torn down
+					return
+				self.__render_time += 0.1*((perf_counter() - t) - self.__render_time)
+				self.__rendered += 1
+				if self.__result != None:
+					# The previous result was never taken
+					self.__dropped += 1
+				self.__result = result
+			try:
+				self.__ready()
+			except RuntimeError:
+				# The display has gone
+				return
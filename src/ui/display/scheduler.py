@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#
+# scheduler.py
+#
+# Display refresh scheduler for the SDRLibEConsole application
+#
+# Copyright (C) 2020 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+	Drives every display from one precise timer paced by a FramePacer.
+	Displays register a refresh callback which is called once per frame.
+"""
+class DisplayScheduler(QObject):
+
+	def __init__(self, fps = DISP_FPS):
+		"""
+		Constructor
+
+		Arguments:
+			fps		--	target refresh rate
+		"""
+
+		super(DisplayScheduler, self).__init__()
+
+		self.__pacer = FramePacer(fps)
+		self.__callbacks = []
+		self.__timer = QTimer(self)
+		self.__timer.setSingleShot(True)
+		self.__timer.setTimerType(Qt.PreciseTimer)
+		self.__timer.timeout.connect(self.__tick)
+
+	#===========================================================================================
+	# PUBLIC
+
+	def add(self, callback):
+		""" Add a display refresh callback """
+		self.__callbacks.append(callback)
+
+	def remove(self, callback):
+		""" Remove a display refresh callback """
+		if callback in self.__callbacks:
+			self.__callbacks.remove(callback)
+
+	def start(self):
+		""" Start refreshing """
+		self.__timer.start(int(self.__pacer.start()*1000))
+
+	def stop(self):
+		""" Stop refreshing """
+		self.__timer.stop()
+
+	def setRate(self, fps):
+		""" Set the target refresh rate """
+		self.__pacer.set_rate(fps)
+
+	def reportRenderTime(self, seconds):
+		""" Report the time a display took to render a frame off the GUI thread """
+		self.__pacer.report_render(seconds)
+
+	def getStats(self):
+		""" Return the frame statistics dict """
+		return self.__pacer.get_stats()
+
+	#===========================================================================================
+	# PRIVATE
+
+	def __tick(self):
+		""" Refresh all displays and schedule the next frame """
+		self.__pacer.frame_start()
+		for callback in self.__callbacks:
+			try:
+				callback()
+			except Exception as e:
+				print('Exception in display refresh [%s][%s]' % (str(e), traceback.format_exc()))
+		self.__timer.start(int(round(self.__pacer.frame_end()*1000)))
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+#
+# waterfall.py
+#
+# Python waterfall display GUI for the SDRLibEConsole application
+#
+# Copyright (C) 2020 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+	Waterfall display for one receiver.
+	Sits below the panadapter and is fed each new frame by it.
+
+	The image is a ring of rows in a numpy buffer with a QImage over it.
+	The panadapter render worker colours each frame through a 256 entry
+	lookup table with makeRow(). The GUI thread copies the row into the
+	ring before the head with addRow() and moves the head up one row,
+	nothing else is touched.
+
+	The paint is two blits, the head to the end of the buffer and then the
+	start to the head. The newest row is always at the top and the cost
+	does not depend on the depth.
+"""
+
+# Colour stops for the lookup table, position 0-1 and r, g, b
+WF_STOPS = (
+	(0.00, (0, 0, 0)),
+	(0.20, (0, 0, 140)),
+	(0.40, (0, 140, 220)),
+	(0.60, (0, 220, 80)),
+	(0.80, (240, 220, 0)),
+	(1.00, (255, 40, 0)),
+)
+
+def make_lut(stops = WF_STOPS):
+	""" Return a 256 entry uint32 ARGB lookup table interpolated from the stops """
+	pos = np.linspace(0.0, 1.0, 256)
+	x = [s[0] for s in stops]
+	lut = np.full(256, 0xFF000000, dtype=np.uint32)
+	for n, shift in enumerate((16, 8, 0)):
+		c = np.interp(pos, x, [s[1][n] for s in stops])
+		lut |= np.rint(c).astype(np.uint32) << shift
+	return lut
+
+class Waterfall(QWidget):
+
+	def __init__(self, rx_id, width, height, depth = WF_DEPTH, db_min = WF_DB_MIN, db_max = WF_DB_MAX):
+		"""
+		Constructor
+
+		Arguments:
+			rx_id			--	RX ID this display belongs to
+			width			-- 	Full display area width
+			height			--	Full display area height
+			depth			--	number of frames held
+			db_min			--	dBm at the bottom of the colour range
+			db_max			--	dBm at the top of the colour range
+		"""
+
+		super(Waterfall, self).__init__()
+
+		self.__rx_id = rx_id
+		self.__width = width
+		self.__height = height
+		self.__depth = depth
+		# Must line up with the panadapter trace
+		self.__left_border = 50
+		self.__right_border = 10
+		self.__pixels = width - self.__left_border - self.__right_border
+
+		# Colour mapping
+		self.__lut = make_lut()
+		self.setColourRange(db_min, db_max)
+
+		# Ring image
+		self.__resampler = None
+		self.__buffer = None
+		self.__image = None
+		self.__head = 0
+		self.__rows = 0
+		self.__makeImage()
+
+	#===========================================================================================
+	# PUBLIC
+
+	def setColourRange(self, db_min, db_max):
+		""" Set the dBm mapped to the first and last colours """
+		self.__db_min = float(db_min)
+		self.__scale = 255.0/max(1.0, float(db_max) - float(db_min))
+
+	def setDepth(self, depth):
+		""" Set the number of frames held, the history is cleared """
+		self.__depth = depth
+		self.__makeImage()
+		self.update()
+
+	def getRowParams(self):
+		""" Return the (pixels, dBm offset, scale) for makeRow(), called on the GUI thread with the job """
+		return self.__pixels, self.__db_min, self.__scale
+
+	def makeRow(self, data, params):
+		"""
+		Return a frame of dBm coloured as a row, in drawing order as the trace.
+		Called on the render worker, the width and colour range come from
+		getRowParams() with the job as the GUI thread writes them.
+		"""
+		pixels, db_min, scale = params
+		if pixels <= 0:
+			return None
+		bins = data.shape[0]
+		if self.__resampler is None or not self.__resampler.matches(bins, pixels):
+			self.__resampler = Resampler(bins, pixels)
+			self.__scaled = np.zeros(pixels, dtype=np.float32)
+			self.__index = np.zeros(pixels, dtype=np.intp)
+		# Peaks are kept when there are more bins than pixels
+		low, high = self.__resampler.resample(data)
+		# dBm to colour index then through the LUT
+		scaled = self.__scaled
+		np.subtract(high, db_min, out=scaled)
+		np.multiply(scaled, scale, out=scaled)
+		np.clip(scaled, 0, 255, out=scaled)
+		np.copyto(self.__index, scaled, casting='unsafe')
+		return np.take(self.__lut, self.__index)
+
+	def addRow(self, row):
+		""" Add a row from makeRow() as the newest row """
+		if self.__image is None or row.shape[0] != self.__pixels:
+			# Made for a previous width
+			return
+		self.__head = (self.__head - 1) % self.__depth
+		self.__rows = min(self.__rows + 1, self.__depth)
+		self.__buffer[self.__head] = row
+		self.update()
+
+	def clear(self):
+		""" Forget the history """
+		self.__rows = 0
+		self.update()
+
+	#===========================================================================================
+	# Qt EVENTS
+
+	def resizeEvent(self, e):
+		self.__width = e.size().width()
+		self.__height = e.size().height()
+		pixels = self.__width - self.__left_border - self.__right_border
+		if pixels != self.__pixels:
+			self.__pixels = pixels
+			self.__makeImage()
+
+	def paintEvent(self, e):
+		if self.__image is None or self.__rows == 0:
+			return
+		qp = QPainter()
+		qp.begin(self)
+		# Scale the depth to the widget height
+		ypr = float(self.__height)/float(self.__depth)
+		top = self.__depth - self.__head
+		# Newest rows, head to the end of the buffer
+		rows = min(top, self.__rows)
+		qp.drawImage(QRectF(self.__left_border, 0, self.__pixels, rows*ypr), self.__image, QRectF(0, self.__head, self.__pixels, rows))
+		# then wrapped rows from the start of the buffer
+		rows = self.__rows - rows
+		if rows > 0:
+			qp.drawImage(QRectF(self.__left_border, top*ypr, self.__pixels, rows*ypr), self.__image, QRectF(0, 0, self.__pixels, rows))
+		qp.end()
+
+	#===========================================================================================
+	# PRIVATE
+
+	def __makeImage(self):
+		""" Allocate the ring image for the current width and depth """
+		self.__head = 0
+		self.__rows = 0
+		if self.__pixels <= 0:
+			self.__buffer = None
+			self.__image = None
+			return
+		self.__buffer = np.zeros((self.__depth, self.__pixels), dtype=np.uint32)
+		# The image shares the buffer, keep the buffer referenced while the image lives
+		self.__image = QImage(self.__buffer.data, self.__pixels, self.__depth, self.__buffer.strides[0], QImage.Format_RGB32)
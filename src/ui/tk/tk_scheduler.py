@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+# tk_scheduler.py
+#
+# Frame loop for the Tk UI
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+"""
+
+The Tk counterpart of the Qt DisplayScheduler, one after() chain paced by a
+FramePacer calling every registered callback once per frame.
+
+The scheduler holds the id of the one pending after() call. Starting when
+already running does nothing and stopping cancels the pending call, so
+however often the UI is started and stopped there is never more than one
+chain. A callback may stop the loop, the next frame is then not scheduled.
+
+"""
+
+#=====================================================
+# Tk frame scheduler
+#=====================================================
+class TkScheduler:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, root, fps = DISP_FPS):
+        """
+        Constructor
+
+        Arguments:
+            root    --  the Tk root
+            fps     --  target frame rate
+
+        """
+
+        self.__root = root
+        self.__pacer = FramePacer(fps)
+        self.__callbacks = []
+        # The pending after() id, None when stopped or in a frame
+        self.__after_id = None
+        self.__running = False
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def add(self, callback):
+        # Add a callback, called once per frame
+        self.__callbacks.append(callback)
+
+    def remove(self, callback):
+        # Remove a callback
+        if callback in self.__callbacks:
+            self.__callbacks.remove(callback)
+
+    def start(self):
+        # Start the frame loop if not running
+        if self.__running:
+            return
+        self.__running = True
+        self.__schedule(self.__pacer.start())
+
+    def stop(self):
+        # Stop the frame loop
+        self.__running = False
+        if self.__after_id != None:
+            self.__root.after_cancel(self.__after_id)
+            self.__after_id = None
+
+    def running(self):
+        return self.__running
+
+    def set_rate(self, fps):
+        # Set the target frame rate
+        self.__pacer.set_rate(fps)
+
+    def get_stats(self):
+        # Frame statistics
+        return self.__pacer.get_stats()
+
+    #=====================================================
+    # PRIVATE
+    #=====================================================
+    def __schedule(self, delay):
+        self.__after_id = self.__root.after(int(round(delay*1000)), self.__tick)
+
+    def __tick(self):
+        # Run all callbacks and schedule the next frame
+        self.__after_id = None
+        self.__pacer.frame_start()
+        for callback in self.__callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print('Exception in frame callback [%s][%s]' % (str(e), traceback.format_exc()))
+        # Unless a callback stopped the loop, or stopped and started it again
+        if self.__running and self.__after_id == None:
+            self.__schedule(self.__pacer.frame_end())
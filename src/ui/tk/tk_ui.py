@@ -36,7 +36,7 @@ class TkUi:
     
     #-------------------------------------------------
     # Constructor
-    def __init__(self):
+    def __init__(self, fps = DISP_FPS):
         # Create the root Tk object
         self.root = Tk()
         # Create a style object
@@ -58,6 +58,9 @@ class TkUi:
         # Component state
         self.vfo_digits = []
         self.__last_freq = 7100000
+        # The digits as shown and wheel steps not yet applied
+        self.__vfo_text = ''
+        self.__freq_inc = 0
         self.modes = []
         self.filters = []
         
@@ -84,26 +87,52 @@ class TkUi:
         self.__t_margin = 20
         self.__b_margin = 30
         # spec
-        self.__v_space = self.__canvas_h - self.__t_margin - self.__b_margin
         self.__h_space = self.__canvas_w - self.__l_margin - self.__r_margin
         self.__db_range = abs(self.__low_db) + self.__high_db
-        self.__dbpp = float(float(self.__v_space)/self.__db_range)
+        # Transforms, grid, legend values and trace coordinates
+        self.__geom = SpecGeometry(self.__l_margin, self.__r_margin, self.__t_margin, self.__b_margin)
+        self.__geom.set_size(self.__canvas_w, self.__canvas_h, self.__h_step)
+        # Follow the noise floor with the dB scale
+        self.__auto = None
+        if Model.get_app_model().get('AUTO_RANGE', False):
+            self.__auto = AutoRange(self.__db_range, self.__db_step, self.__low_db)
         # colors
         self.__grid_color = 'slate gray'
         self.__plot_color = 'yellow'
         
         # Get the connector instance
         self.__con = getInstance('interface_inst')
+        # Control calls go through the dispatcher
+        self.__dispatcher = getInstance('dispatcher_inst')
         self.init = False
+        # Set from start until the library is delivering frames
+        self.__starting = False
+        # Frame sequence when the display width was set, None until then
+        self.__ready_seq = None
+        # The one frame loop
+        self.__scheduler = TkScheduler(self.root, fps)
+        self.__scheduler.add(self.timer_evnt)
+        # Frame tracking, last frame sequence rendered and counters
+        self.__frame_seq = 0
+        # Retained display items
+        self.__db_legends = []
+        self.__freq_legends = []
+        self.__trace_id = None
+        self.__trace_xy = None
+        # Waterfall under the trace
+        self.__waterfall = TkWaterfall(self.root, self.__canvas_w, self.__h_space, self.__l_margin)
+        self.frames_rendered = 0
+        self.frames_dropped = 0
 
     # Enter main UI loop
     def run (self):
         # Build the UI
         self.build_ui()
-        # Create a timer event
-        self.root.after(100, self.timer_evnt)
+        # Start the frame loop
+        self.__scheduler.start()
         # Main loop exits when window is closed
         self.root.mainloop()
+        self.__scheduler.stop()
     
     #-------------------------------------------------
     # Builder methods
@@ -125,6 +154,7 @@ class TkUi:
         filter_frm.grid(column=0, row=2, sticky='N')
         control_frm.grid(column=0, row=3, sticky='S')
         self.canvas.grid(column=1, row=1, rowspan=3)
+        self.__waterfall.canvas.grid(column=1, row=4)
         
         # Build components
         self.build_vfo(vfo_frm)
@@ -186,41 +216,62 @@ class TkUi:
         stop.grid(column=1, row=1)
     
     def build_display(self, canvas):
+        # The display items are created once here and then only updated
         self.create_rectangle(0, 0, 600, 300, fill='dark slate gray')
+        self.__geom.set_db_range(self.__low_db, self.__db_step, self.__v_step)
+        self.__geom.set_span(self.__last_freq, self.__span_freq)
         self.h_grid(self.canvas)
         self.v_grid(self.canvas)
-        if self.init: self.spec(self.canvas)
+        # The trace is a single line, its coordinates are replaced each frame
+        self.__trace_id = self.canvas.create_line(0, 0, 0, 0, fill=self.__plot_color)
     
     def h_grid(self, canvas ):
-        y_inc = (self.__canvas_h - self.__t_margin - self.__b_margin) / self.__v_step
-        for step in range(0, self.__v_step + 1):
+        for (x0, y0, x1, y1), (y, db) in zip(self.__geom.h_lines().tolist(), self.__geom.db_legends()):
             # Draw line
-            self.canvas.create_line(self.__l_margin, self.__t_margin + (y_inc * step), self.__canvas_w - self.__r_margin , self.__t_margin + (y_inc * step), fill=self.__grid_color)
-            # Draw legend
-            self.canvas.create_text(10, self.__t_margin + (y_inc * step), anchor=W, font="Purisa 10", fill="#fb0", text=str(self.__high_db - (self.__db_step * step)))
+            self.canvas.create_line(x0, y0, x1, y1, fill=self.__grid_color)
+            # Legend, the text is updated by update_legends()
+            self.__db_legends.append(self.canvas.create_text(10, y, anchor=W, font="Purisa 10", fill="#fb0", text=self.__db_text(db)))
     
     def v_grid(self, canvas ):
-        x_inc = (self.__canvas_w - self.__l_margin - self.__r_margin) / self.__h_step
-        f_start = float((self.__last_freq - (self.__span_freq/2))/1000000.0)
-        for step in range(0, self.__h_step + 1):
+        for (x0, y0, x1, y1), (x, f) in zip(self.__geom.v_lines().tolist(), self.__geom.freq_legends()):
             # Draw line
-            self.canvas.create_line(self.__l_margin + (x_inc * step), self.__t_margin, self.__l_margin + (x_inc * step), self.__canvas_h - self.__b_margin, fill=self.__grid_color)
-            # Draw legend
-            f = str("%.3f" % round(f_start + float((self.__f_step * step)/1000000.0) ,3))
-            self.canvas.create_text(self.__l_margin - 15 + (x_inc * step), self.__canvas_h - 10, anchor=W, font="Purisa 10", fill="#fb0", text=f)
+            self.canvas.create_line(x0, y0, x1, y1, fill=self.__grid_color)
+            # Legend, the text is updated by update_legends()
+            self.__freq_legends.append(self.canvas.create_text(x - 15, self.__canvas_h - 10, anchor=W, font="Purisa 10", fill="#fb0", text=self.__freq_text(f)))
+    
+    def update_legends(self):
+        # Rewrite the legends if the frequency or dB range has changed
+        if self.__geom.set_db_range(self.__low_db, self.__db_step, self.__v_step):
+            for item, (y, db) in zip(self.__db_legends, self.__geom.db_legends()):
+                self.canvas.itemconfigure(item, text=self.__db_text(db))
+        if self.__geom.set_span(self.__last_freq, self.__span_freq):
+            for item, (x, f) in zip(self.__freq_legends, self.__geom.freq_legends()):
+                self.canvas.itemconfigure(item, text=self.__freq_text(f))
     
     def spec(self, canvas):
         # Get data if ready
-        d = self.__con.get_disp_data()
-        # We have one value for each pixel in the display area
-        for pix in range(0, self.__h_space, 2):
-            self.canvas.create_line(pix, self.__db_to_y(d[pix]), pix+1, self.__db_to_y(d[pix+1]), fill=self.__plot_color)
+        d = self.__con.get_disp_frame()
+        if d is None: return
+        # One point per pixel or a min/max pair when there are more bins than pixels
+        points = self.__geom.trace_points(d.shape[0])
+        if self.__trace_xy is None or self.__trace_xy.shape[0] != points:
+            self.__trace_xy = np.zeros((points, 2), dtype=np.float64)
+            self.__geom.trace_x(self.__trace_xy)
+        self.__geom.trace(d, self.__trace_xy)
+        self.canvas.coords(self.__trace_id, self.__trace_xy.ravel().tolist())
         
-    def __db_to_y(self, dbm):
-        # Not sure how to offset and scale this
-        #rel_db = (abs(self.__st_db) - abs(int(dbm))) + 150
-        rel_db = (abs(self.__low_db) - abs(int(dbm)))
-        return (self.__t_margin + self.__v_space) - (rel_db * self.__dbpp)
+    def __auto_range(self):
+        # Move the dB scale with the noise floor
+        d = self.__con.get_disp_frame()
+        if d is not None:
+            self.__low_db = int(self.__auto.update(d))
+            self.__high_db = int(self.__auto.high())
+    
+    def __db_text(self, db):
+        return str(int(db))
+    
+    def __freq_text(self, f):
+        return str("%.3f" % round(f/1000000.0, 3))
             
     #-------------------------------------------------
     # Utility methods
@@ -236,25 +287,28 @@ class TkUi:
         """
         
         freq_str = str(freq).zfill(9)
-        self.vfo_digits[0].config(text=freq_str[0])
-        self.vfo_digits[1].config(text=freq_str[1])
-        self.vfo_digits[2].config(text=freq_str[2])
-        self.vfo_digits[3].config(text=freq_str[3])
-        self.vfo_digits[4].config(text=freq_str[4])
-        self.vfo_digits[5].config(text=freq_str[5])
-        self.vfo_digits[6].config(text=freq_str[6])
-        self.vfo_digits[7].config(text=freq_str[7])
-        self.vfo_digits[8].config(text=freq_str[8])
+        # Only reconfigure the digits that have changed
+        for n, digit in enumerate(freq_str):
+            if n >= len(self.__vfo_text) or digit != self.__vfo_text[n]:
+                self.vfo_digits[n].config(text=digit)
+        self.__vfo_text = freq_str
         
         self.__last_freq = freq
     
     def __inc_freq(self, evnt, inc):
-        v = inc
+        # Steps are added up and applied once per frame by __apply_freq()
         if evnt.delta < 0:
             inc = -inc            
-        self.__last_freq = self.__last_freq + inc
-        self.__adjust_vfo(self.__last_freq)
-        if self.init: self.__con.set_freq(self.__last_freq)
+        self.__freq_inc += inc
+    
+    def __apply_freq(self):
+        # One VFO update and one library call for all steps in the frame
+        if self.__freq_inc == 0: return
+        freq = min(max(0, self.__last_freq + self.__freq_inc), 999999999)
+        self.__freq_inc = 0
+        if freq == self.__last_freq: return
+        self.__adjust_vfo(freq)
+        if self.init: self.__dispatcher.set_freq(freq)
         
     # Used to create rectangles with alpha as this requires use of PIL lib
     def create_rectangle(self, x1, y1, x2, y2, **kwargs):
@@ -292,32 +346,76 @@ class TkUi:
     
     # On timer
     def timer_evnt(self):
-        # Build displays
-        if self.init: self.build_display(self.canvas)
-        self.root.update()
-        self.root.after(100, self.timer_evnt)
+        # Called by the scheduler each frame
+        if self.__starting:
+            self.__poll_start()
+        # After the readiness check so steps in the first frame reach the library
+        self.__apply_freq()
+        # Update displays only when there is a new frame
+        if self.init and self.__con.has_new_frame(self.__frame_seq):
+            seq = self.__con.disp_seq
+            # Any gap in the sequence is frames we never rendered
+            if self.__frame_seq > 0:
+                self.frames_dropped += seq - self.__frame_seq - 1
+            self.__frame_seq = seq
+            if self.__auto != None:
+                self.__auto_range()
+            self.update_legends()
+            self.spec(self.canvas)
+            self.__waterfall.add_frame(self.__con.get_disp_frame())
+            self.frames_rendered += 1
+    
+    def get_frame_stats(self):
+        # Frame loop statistics with the frames rendered and dropped
+        stats = self.__scheduler.get_stats()
+        stats['rendered'] = self.frames_rendered
+        stats['dropped'] = self.frames_dropped
+        return stats
         
     #-------------------------------------------------
     # Control methods
     #
     def start_lib(self):
-        self.__con.run_lib()
-        sleep(1)
-        # Set our display width
-        self.__con.set_disp_width(self.__h_space)
-        # Create a timer event
-        self.root.after(100, self.timer_evnt)
-        self.init = True
+        if self.init or self.__starting: return
+        # Start on the dispatcher, the frame loop polls for the library to be ready
+        self.__starting = True
+        self.__ready_seq = None
+        self.__dispatcher.run_lib()
     
     def stop_lib(self, ):
-        if self.init: self.__con.close_lib()
+        if self.init or self.__starting: self.__dispatcher.close_lib()
         self.init = False
+        self.__starting = False
+    
+    def __poll_start(self):
+        if self.__ready_seq == None:
+            # Wait for the run call to return then set our display width,
+            # a fixed resolution frame is resampled
+            if not self.__dispatcher.wait_idle(0): return
+            self.__con.set_disp_width(DISP_BINS if DISP_BINS > 0 else self.__h_space)
+            self.__ready_seq = self.__con.poll_disp_frame()
+            return
+        # Ready when the library produces a valid frame at our width
+        if not self.__con.has_new_frame(self.__ready_seq): return
+        d = self.__con.get_disp_frame()
+        if d is None or not np.isfinite(d).all(): return
+        self.__starting = False
+        self.__frame_seq = 0
+        self.init = True
+        # Catch the library up with any tuning done while starting
+        self.__dispatcher.set_freq(self.__last_freq)
         
+    def set_freq(self, freq):
+        # Tune to freq in Hz as if from the VFO, used by a replay
+        self.__freq_inc = 0
+        self.__adjust_vfo(freq)
+        if self.init: self.__dispatcher.set_freq(freq)
+    
     def set_mode(self, mode):
-        if self.init: self.__con.set_mode(mode)
+        if self.init: self.__dispatcher.set_mode(mode)
     
     def set_filter(self, filt):
-        if self.init: self.__con.set_filter(filt)
+        if self.init: self.__dispatcher.set_filter(filt)
         
 """
 frm = ttk.Frame(root, padding=10)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+#
+# tk_waterfall.py
+#
+# Waterfall display for the Tk UI
+#
+# Copyright (C) 2023 by G3UKB Bob Cowdery
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#  The author can be reached by email at:
+#     bob@bobcowdery.plus.com
+#
+
+# Import all
+from main.imports import *
+
+from tkinter import *
+
+"""
+
+Waterfall for the Tk UI, one persistent PhotoImage on its own canvas.
+
+The image is twice the depth high and every row is written twice, at the
+head and one depth below it, so any depth rows from the head down are the
+history with the newest at the top. Scrolling is moving the image item up
+so the head is at the top of the canvas, the canvas clips the rest and
+nothing already in the image is touched.
+
+A frame is resampled to the display width, scaled to a colour index and
+taken through a table of '#rrggbb ' strings held as bytes, so the row
+data for put() is a single take and join in numpy with no per pixel
+Python.
+
+"""
+
+#=====================================================
+# Colour table
+def make_hex_lut(stops = WF_STOPS):
+    """
+    Return a (256, 8) uint8 array of '#rrggbb ' for each colour index
+
+    stops   --  colour stops as for the Qt waterfall
+
+    """
+
+    lut = make_lut(stops)
+    text = ''.join(['#%06x ' % (int(c) & 0xFFFFFF) for c in lut])
+    return np.frombuffer(text.encode('ascii'), dtype=np.uint8).reshape(256, 8).copy()
+
+#=====================================================
+# Waterfall
+#=====================================================
+class TkWaterfall:
+
+    #-------------------------------------------------
+    # Constructor
+    def __init__(self, parent, width, pixels, left, depth = WF_DEPTH, db_min = WF_DB_MIN, db_max = WF_DB_MAX):
+        """
+        Constructor
+
+        Arguments:
+            parent  --  parent widget for the canvas
+            width   --  canvas width
+            pixels  --  width of the waterfall, lines up with the trace
+            left    --  left margin of the trace
+            depth   --  number of frames held and canvas height
+            db_min  --  dBm at the bottom of the colour range
+            db_max  --  dBm at the top of the colour range
+
+        """
+
+        self.__pixels = pixels
+        self.__left = left
+        self.__depth = depth
+        self.canvas = Canvas(parent, width=width, height=depth, bg='black', highlightthickness=0)
+
+        # Colour mapping
+        self.__lut = make_hex_lut()
+        self.set_colour_range(db_min, db_max)
+        self.__resampler = None
+        self.__scaled = np.zeros(pixels, dtype=np.float32)
+        self.__index = np.zeros(pixels, dtype=np.intp)
+
+        # Ring image, held here as Tk does not keep a reference
+        self.__image = PhotoImage(width=pixels, height=2*depth)
+        self.__item = self.canvas.create_image(left, 0, image=self.__image, anchor='nw')
+        self.__head = 0
+
+    #=====================================================
+    # PUBLIC
+    #=====================================================
+    def set_colour_range(self, db_min, db_max):
+        # Set the dBm mapped to the first and last colours
+        self.__db_min = float(db_min)
+        self.__scale = 255.0/max(1.0, float(db_max) - float(db_min))
+
+    def add_frame(self, data):
+        """
+        Add a frame as the newest row
+
+        Arguments:
+            data    --  spectrum in dBm
+
+        """
+
+        if data is None: return
+        pixels = self.__pixels
+        if self.__resampler is None or not self.__resampler.matches(data.shape[0], pixels):
+            self.__resampler = Resampler(data.shape[0], pixels)
+        # Peaks are kept when there are more bins than pixels
+        low, high = self.__resampler.resample(data)
+        # dBm to colour index
+        scaled = self.__scaled
+        np.subtract(high, self.__db_min, out=scaled)
+        np.multiply(scaled, self.__scale, out=scaled)
+        np.clip(scaled, 0, 255, out=scaled)
+        np.copyto(self.__index, scaled, casting='unsafe')
+        # One Tcl list of colours for the row
+        row = '{' + self.__lut[self.__index].tobytes().decode('ascii') + '}'
+
+        # Write the row above the last and its copy a depth below
+        self.__head = (self.__head - 1) % self.__depth
+        self.__image.put(row, to=(0, self.__head))
+        self.__image.put(row, to=(0, self.__head + self.__depth))
+        # Scroll by moving the image so the head is at the top
+        self.canvas.coords(self.__item, self.__left, -self.__head)
+
+    def clear(self):
+        # Forget the history
+        self.__image.blank()
+        self.__head = 0
+        self.canvas.coords(self.__item, self.__left, 0)
@@ -60,6 +60,9 @@ class DisplayWindow(QMainWindow):
         
         # Temp for RX1
         self.__display_inst = Panadapter(1, self.__width, self.__height, self.freq_callback)
+        self.__waterfall_inst = Waterfall(1, self.__width, self.__height)
+        self.__display_inst.setWaterfall(self.__waterfall_inst)
+        self.__display_inst.setCenterFreq(Model.get_radio_model()[RX_1]['FREQ'])
         
         self.__setup_ui()
         #-------------------------------------------------
@@ -82,6 +85,11 @@ class DisplayWindow(QMainWindow):
     # PUBLIC
     #==============================================================================================
     
+    #-------------------------------------------------
+    # Centre frequency of the display in MHz
+    def setCenterFreq(self, freq):
+        self.__display_inst.setCenterFreq(freq)
+    
     #-------------------------------------------------
     # Window metrics
     #-------------------------------------------------
@@ -98,6 +106,12 @@ class DisplayWindow(QMainWindow):
     #==============================================================================================
     # EVENTS
     #==============================================================================================
+    
+    #-------------------------------------------------
+    # Window closed, the panadapter stops refreshing
+    def closeEvent(self, e):
+        self.__display_inst.terminate()
+        e.accept()
 
     #==============================================================================================
     # PRIVATE
@@ -105,7 +119,14 @@ class DisplayWindow(QMainWindow):
     # Setup UI contents
     def __setup_ui(self) :
         
-        # Set the display in the window
-        self.setCentralWidget(self.__display_inst)
+        # Set the panadapter above the waterfall in the window
+        w = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0,0,0,0)
+        layout.setSpacing(0)
+        w.setLayout(layout)
+        layout.addWidget(self.__display_inst, 3)
+        layout.addWidget(self.__waterfall_inst, 2)
+        self.setCentralWidget(w)
 
     
\ No newline at end of file
@@ -67,6 +67,7 @@ class MainWindow(WindowBase):
         dispAct = QAction(self.style().standardIcon(QStyle.SP_ToolBarHorizontalExtensionButton), 'Disp', self)
         dispAct.setShortcut('Ctrl+D')
         dispAct.triggered.connect(self.__disp)
+        self.__disp_win = None
         
         self.__num_rx = QComboBox()
         self.__num_rx.addItems(('1','2','3'))
@@ -107,6 +108,17 @@ class MainWindow(WindowBase):
         # Set visibility
         self.__set_visibility(Model.get_num_rx())
         
+    #==============================================================================================
+    # PUBLIC
+    #==============================================================================================
+    
+    #-------------------------------------------------
+    # Set the frequency in MHz, the display follows
+    def set_freq(self, freq):
+        WindowBase.set_freq(self, freq)
+        if self.__disp_win != None:
+            self.__disp_win.setCenterFreq(freq)
+    
     #==============================================================================================
     # EVENTS
     #==============================================================================================
@@ -115,8 +127,8 @@ class MainWindow(WindowBase):
     # Run button event
     def __run(self) :
         
-        # Perform a server warmstart
-        self.con.run_lib()
+        # Perform a server warmstart, queued behind any pending commands
+        self.dispatcher.run_lib()
         self.statusBar.showMessage("Running",0)
         self.statusBar.setStyleSheet("QStatusBar {background-color: rgb(102,102,102); color: rgb(0,64,0); font: bold 12px}")
         
@@ -125,7 +137,7 @@ class MainWindow(WindowBase):
     def __stop(self):
         # Stop radio
         state = Model.get_state_model()
-        self.con.close_lib()
+        self.dispatcher.close_lib()
         self.statusBar.showMessage("Stopped",0)
         self.statusBar.setStyleSheet("QStatusBar {background-color: rgb(102,102,102); color: rgb(147,11,11); font: bold 12px}")
         state['RADIO-RUN'] = False
@@ -133,9 +145,11 @@ class MainWindow(WindowBase):
     #-------------------------------------------------
     # Display button event        
     def __disp(self):
-        # Invoke displays
-        self.__disp = DisplayWindow("Panadapter", 0)
-        self.__disp.show()
+        # Invoke displays, closing any already open so it stops refreshing
+        if self.__disp_win != None:
+            self.__disp_win.close()
+        self.__disp_win = DisplayWindow("Panadapter", 0)
+        self.__disp_win.show()
             
     #-------------------------------------------------
     # Exit button event
@@ -155,6 +169,8 @@ class MainWindow(WindowBase):
             # Changed
             Model.set_num_rx(num_rx)
             # Stop and restart the server and set up everything again
+            # once queued commands have run so none reach it mid restart
+            self.dispatcher.wait_idle()
             if not self.con.restart():
                 print("Failed to restart server!")
             # Change the UI enablement and close aux receivers
@@ -49,6 +49,7 @@ class WindowBase(QMainWindow):
         # Get instances
         # TDB These need to be for each instance
         self.con = getInstance('interface_inst')
+        self.dispatcher = getInstance('dispatcher_inst')
         self.mode_win = getInstance('mode_win')
         self.filter_win = getInstance('filter_win')
         self.agc_win = getInstance('agc_win')
@@ -109,7 +110,7 @@ class WindowBase(QMainWindow):
         # VFO control
         vfo_grid = QGridLayout()
         main_grid.addLayout(vfo_grid, 0, 0)
-        self.__vfo = Vfo(self.con, CH_RX, self.__id)
+        self.__vfo = Vfo(self.dispatcher, CH_RX, self.__id)
         self.__vfo.addVfo(self, vfo_grid)
     
     #==============================================================================================
@@ -138,6 +139,27 @@ class WindowBase(QMainWindow):
     def setAudio(self, audio):    
         pass
     
+    #-------------------------------------------------
+    # Settings from elsewhere such as a replay
+    #-------------------------------------------------
+    # Set the VFO frequency in MHz
+    def set_freq(self, freq):
+        self.__vfo.set_freq(freq)
+    
+    #-------------------------------------------------
+    # Set the mode as if chosen from the mode popup
+    def set_mode(self, mode):
+        self.dispatcher.set_mode(mode)
+        self.__radio_model[self.__id]['MODE'] = mode
+        self.setMode(mode_lookup[mode][1])
+    
+    #-------------------------------------------------
+    # Set the filter as if chosen from the filter popup
+    def set_filter(self, filt):
+        self.dispatcher.set_filter(filt)
+        self.__radio_model[self.__id]['FILTER'] = filt
+        self.setFilter(filter_lookup[filt][3])
+    
     #-------------------------------------------------
     # Window metrics
     #-------------------------------------------------
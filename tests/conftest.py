@@ -0,0 +1,9 @@
+#
+# conftest.py
+#
+# The application modules import from the src directory
+#
+
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
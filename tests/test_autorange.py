@@ -0,0 +1,39 @@
+#
+# test_autorange.py
+#
+# AutoRange noise floor and peak estimates
+#
+
+from main.imports import *
+
+def run(frame, frames = 20, low = -140.0):
+    auto = AutoRange(100.0, low=low)
+    for n in range(frames):
+        auto.update(frame)
+    return auto
+
+def test_negative_level_bin():
+    # -120.5 dBm is in the 1 dB bin from -121 to -120
+    auto = run(np.full(1000, -120.5, dtype=np.float32))
+    assert auto.floor == -121
+    assert auto.peak == -120
+
+def test_whole_db_level_bin():
+    auto = run(np.full(1000, -120.0, dtype=np.float32))
+    assert auto.floor == -120
+    assert auto.peak == -119
+
+def test_floor_and_peak():
+    # Mostly noise near -130.3 dBm with a few carriers near -60.7 dBm
+    frame = np.full(1000, -130.3, dtype=np.float32)
+    frame[::10] = -60.7
+    auto = run(frame, low=-100.0)
+    assert auto.floor == -131
+    assert auto.peak == -60
+    # The bottom is a margin below the floor rounded down to the grid step
+    assert auto.low == -150.0
+
+def test_out_of_range_levels():
+    auto = run(np.array([-250.0, 50.0] * 500, dtype=np.float32))
+    assert auto.floor == AR_DB_MIN
+    assert auto.peak == AR_DB_MAX
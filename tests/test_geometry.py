@@ -0,0 +1,55 @@
+#
+# test_geometry.py
+#
+# SpecGeometry dB to pixel transform
+#
+
+import pytest
+
+from main.imports import *
+
+# Plot area 1000 x 290 from y = 10 to y = 300
+TOP = 10
+BOTTOM = 300
+
+def make_geom(db_low):
+    geom = SpecGeometry(50, 10, TOP, 20)
+    geom.set_size(1060, 320, 20)
+    geom.set_db_range(db_low, 10.0, 10)
+    return geom
+
+def y_of(geom, dbm):
+    out = np.zeros(len(dbm), dtype=np.float64)
+    geom.db_to_y(np.array(dbm, dtype=np.float32), out)
+    return out
+
+def test_range_edges():
+    geom = make_geom(-140.0)
+    assert y_of(geom, [-140.0, -40.0]) == pytest.approx([BOTTOM, TOP])
+
+def test_zero_dbm():
+    # -60 to +40 dBm, 0 dBm is 60 dB up from the bottom
+    geom = make_geom(-60.0)
+    assert y_of(geom, [0.0])[0] == pytest.approx(BOTTOM - 60*geom.dbpp)
+
+def test_positive_levels():
+    # +10 to +110 dBm, above 0 and with a positive bottom of range
+    geom = make_geom(10.0)
+    assert y_of(geom, [10.0, 20.0, 25.5]) == pytest.approx([BOTTOM, BOTTOM - 10*geom.dbpp, BOTTOM - 15.5*geom.dbpp])
+
+def test_sub_db_resolution():
+    geom = make_geom(-140.0)
+    y = y_of(geom, [-100.0, -100.5])
+    assert y[1] - y[0] == pytest.approx(0.5*geom.dbpp)
+
+def test_clamped_to_plot():
+    geom = make_geom(-140.0)
+    assert y_of(geom, [-200.0, 10.0]) == pytest.approx([BOTTOM, TOP])
+
+def test_trace_view():
+    # The trace writes into a strided view of the (n, 2) array
+    geom = make_geom(-60.0)
+    xy = np.zeros((geom.trace_points(1000), 2), dtype=np.float64)
+    geom.trace_x(xy)
+    geom.trace(np.full(1000, 0.0, dtype=np.float32), xy)
+    assert xy[:, 1] == pytest.approx(BOTTOM - 60*geom.dbpp)